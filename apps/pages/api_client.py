@@ -0,0 +1,816 @@
+import codecs
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from django.conf import settings
+
+from . import metrics
+from .backend_pool import BackendPool
+
+DEFAULTS = {
+    'CONNECT_TIMEOUT' : 3.05,
+    'READ_TIMEOUT'    : 15,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE'    : 20,
+    'POOL_BLOCK'      : False,
+    'FANOUT_WORKERS'  : 4,
+    'TOKEN_REFRESH_LEEWAY': 30,
+    'BREAKER_FAILURE_THRESHOLD': 5,
+    'BREAKER_RECOVERY_TIMEOUT' : 30,
+    'BREAKER_HALF_OPEN_PROBES' : 1,
+    'CONDITIONAL_GET'          : True,
+    'CONDITIONAL_MAX_ENTRIES'  : 256,
+    'STREAM_CHUNK_SIZE'        : 64 * 1024,
+    'STREAM_CAPTURE_MAX_BYTES' : 2 * 1024 * 1024,
+    'COALESCE_GETS'            : True,
+    'COALESCE_WINDOW'          : 0.0,
+    'RETRY_METHODS'            : ('GET', 'HEAD', 'OPTIONS'),
+    'RETRY_STATUSES'           : (502, 503, 504),
+    'RETRY_MAX_ATTEMPTS'       : 3,
+    'RETRY_BACKOFF'            : 0.1,
+    'RETRY_BACKOFF_MAX'        : 2.0,
+    'RETRY_DEADLINE'           : 5.0,
+    'RETRY_BUDGET_RATIO'       : 0.1,
+    'RETRY_BUDGET_MAX'         : 20,
+    'REQUEST_DEADLINE'         : 0,
+    'BACKEND_EJECT_THRESHOLD'  : 3,
+    'BACKEND_EJECT_DURATION'   : 30,
+}
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_SEPARATORS = _WHITESPACE + ',]'
+
+def iter_json_array(chunks, encoding='utf-8'):
+    """
+    Incrementally decode a JSON document from an iterable of byte chunks and
+    yield the items of its top-level array one at a time.
+
+    Only the current, not yet decoded, part of the text is buffered. A
+    top-level object (e.g. a paginated {"results": [...]}) is decoded in full
+    and its `results` are yielded.
+    """
+    decode = codecs.getincrementaldecoder(encoding)(errors='replace')
+    buffer = ''
+    pos = 0
+    started = False
+    exhausted = False
+    chunks = iter(chunks)
+
+    def fill():
+        nonlocal buffer, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[pos:] + decode.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + decode.decode(chunk)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or exhausted:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] != '[':
+        # Not a list: decode the whole document
+        while not exhausted:
+            fill()
+        document = json.loads(buffer[pos:])
+        yield from document.get('results', []) if isinstance(document, dict) else [document]
+        return
+
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError('Unexpected end of JSON list')
+        char = buffer[pos]
+        if not started:
+            started = True
+            pos += 1
+            skip_whitespace()
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+            continue
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # An item is complete once it is followed by a separator: a number
+        # at the end of the buffer ("2." of "2.5") may still be cut short
+        if end is None or end >= len(buffer) or buffer[end] not in _SEPARATORS:
+            if exhausted:
+                raise ValueError('Invalid JSON list item')
+            fill()
+            continue
+        pos = end
+        yield item
+
+def get_backend_urls():
+    """
+    Base URLs of the backend API nodes, from settings.API_BACKENDS
+    """
+    return [url.rstrip('/') + '/' for url in settings.API_BACKENDS]
+
+def get_api_base():
+    """
+    Base URL to build backend endpoint URLs with. It is the first node's;
+    the client maps each call to whichever node of the pool it picks.
+    """
+    return get_backend_urls()[0]
+
+def get_client_config():
+    """
+    Merge the API_CLIENT settings over the built-in defaults
+    """
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'API_CLIENT', {}))
+    return config
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised without touching the network while the circuit breaker is open.
+    Subclasses ConnectionError so views render their "API offline" state.
+    """
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """
+    Raised when a call is skipped, or timed out, because the time budget of
+    the Django request that made it ran out
+    """
+
+class Deadline:
+    """
+    Time budget shared by all backend calls of one Django request.
+
+    Each call gets the smaller of its usual timeouts and the time left;
+    once nothing is left, calls are skipped and the request is `degraded`
+    so the page can say it shows partial data.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degraded = False
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, url):
+        if self.expired:
+            self.degraded = True
+            raise DeadlineExceeded(f'No time left for {url}')
+
+    def timeout(self, default):
+        """
+        `default` (a (connect, read) tuple) capped at the time left
+        """
+        remaining = self.remaining()
+        connect, read = default if isinstance(default, tuple) else (default, default)
+        return (min(connect, remaining), min(read, remaining))
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for the backend API.
+
+    CLOSED: calls go through. After `failure_threshold` consecutive failures
+    the breaker OPENs and calls fail fast for `recovery_timeout` seconds.
+    Then it is HALF_OPEN: up to `half_open_probes` calls are let through;
+    a success closes the breaker, a failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30, half_open_probes=1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError unless the call may go through
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return
+        raise CircuitOpenError('Backend API circuit breaker is open')
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_cancelled(self):
+        """
+        A call cut short by its caller (request deadline) or that failed on
+        our side: neither a success nor a failure, but it gives back its
+        half-open probe
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+            }
+
+def is_failure_status(status_code):
+    # Gateway/availability errors count against the breaker, 4xx do not
+    return status_code >= 500
+
+class RetryBudget:
+    """
+    Count of retries that may still be spent, shared by many calls so a
+    failing backend is not hit with `calls x attempts` requests.
+
+    Retries are earned back with `deposit` as calls complete, up to `limit`.
+    """
+
+    def __init__(self, retries, limit=None):
+        self.remaining = retries
+        self.limit = limit
+        self._lock = threading.Lock()
+
+    def spend(self):
+        with self._lock:
+            if self.remaining < 1:
+                return False
+            self.remaining -= 1
+            return True
+
+    def deposit(self, amount):
+        with self._lock:
+            self.remaining += amount
+            if self.limit is not None:
+                self.remaining = min(self.remaining, self.limit)
+
+def backoff_delay(base, attempt, cap=None):
+    """
+    Exponential backoff with jitter before retry number `attempt` (1-based)
+    """
+    delay = base * (2 ** (attempt - 1))
+    if cap is not None:
+        delay = min(delay, cap)
+    return delay * random.uniform(0.5, 1.5)
+
+class RetryPolicy:
+    """
+    Which calls of the client are retried, and how.
+
+    Only idempotent `methods` are retried, on connection errors, timeouts
+    and `statuses`; never when the circuit breaker is open. Attempts are
+    spaced with exponential backoff and jitter, stop after `max_attempts`
+    or when the next one could not start within `deadline` seconds of the
+    first, and each retry is paid from the worker-wide `budget`.
+    """
+
+    def __init__(self, methods, statuses, max_attempts, backoff, backoff_max, deadline, budget):
+        self.methods = {method.upper() for method in methods}
+        self.statuses = set(statuses)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.budget = budget
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            methods=config['RETRY_METHODS'],
+            statuses=config['RETRY_STATUSES'],
+            max_attempts=config['RETRY_MAX_ATTEMPTS'],
+            backoff=config['RETRY_BACKOFF'],
+            backoff_max=config['RETRY_BACKOFF_MAX'],
+            deadline=config['RETRY_DEADLINE'],
+            budget=RetryBudget(config['RETRY_BUDGET_MAX'], limit=config['RETRY_BUDGET_MAX']),
+        )
+
+    def applies_to(self, method):
+        return method.upper() in self.methods and self.max_attempts > 1
+
+    @staticmethod
+    def retry_after(response):
+        value = response.headers.get('Retry-After', '') if response is not None else ''
+        return float(value) if value.isdigit() else None
+
+    def next_delay(self, attempt, started, response=None, deadline=None):
+        """
+        Seconds to wait before retrying after `attempt`, or None to give up
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = backoff_delay(self.backoff, attempt, self.backoff_max)
+        delay = max(delay, self.retry_after(response) or 0)
+        if time.monotonic() - started + delay >= self.deadline:
+            return None
+        if deadline is not None and delay >= deadline.remaining():
+            return None
+        if not self.budget.spend():
+            return None
+        return delay
+
+class ConditionalGetStore:
+    """
+    ETag / Last-Modified validators and bodies of GET responses, per tenant and URL.
+
+    Bounded LRU: the least recently used entry is dropped past `max_entries`.
+    Counters are kept per endpoint path.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, url, stat, amount=1):
+        endpoint = urlsplit(url).path
+        stats = self._stats.setdefault(endpoint, {'requests': 0, 'not_modified': 0, 'bytes_saved': 0})
+        stats[stat] += amount
+
+    def conditional_headers(self, tenant, url):
+        """
+        Validator headers to send for this GET, if a copy is cached
+        """
+        with self._lock:
+            self._count(url, 'requests')
+            entry = self._entries.get((tenant, url))
+            if entry is None:
+                return {}
+            self._entries.move_to_end((tenant, url))
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def has_validators(self, response):
+        return bool(response.headers.get('ETag') or response.headers.get('Last-Modified'))
+
+    def store(self, tenant, url, response, content=None):
+        """
+        Keep the validators and body of a 200. Streamed responses pass the
+        `content` they captured while being decoded.
+        """
+        if not self.has_validators(response):
+            return
+        entry = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content': response.content if content is None else content,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+        }
+        with self._lock:
+            self._entries[(tenant, url)] = entry
+            self._entries.move_to_end((tenant, url))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def replay(self, tenant, url, not_modified):
+        """
+        Turn a 304 into a 200 built from the cached copy, or None if there is none
+        """
+        with self._lock:
+            entry = self._entries.get((tenant, url))
+            if entry is None:
+                return None
+            self._count(url, 'not_modified')
+            self._count(url, 'bytes_saved', len(entry['content']))
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = entry['content']
+        response._content_consumed = True
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        for header in ('ETag', 'Last-Modified', 'Date', 'Cache-Control', 'Expires'):
+            if header in not_modified.headers:
+                response.headers[header] = not_modified.headers[header]
+        response.encoding = entry['encoding']
+        response.url = url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        return response
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'endpoints': {endpoint: dict(stats) for endpoint, stats in self._stats.items()},
+            }
+
+class GetCoalescer:
+    """
+    Single-flight for identical tenant GETs across requests of one worker.
+
+    The first caller (the leader) sends the request; callers arriving while
+    it is in flight, or up to `window` seconds after it completed, share its
+    200 response instead of sending their own. Responses that are not shared
+    (errors, streamed bodies over `max_bytes`) make followers call themselves.
+    """
+
+    def __init__(self, window=0.0, max_bytes=2 * 1024 * 1024):
+        self.window = window
+        self.max_bytes = max_bytes
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def join(self, key):
+        """
+        Return (entry, is_leader)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['finished_at'] is not None and now - entry['finished_at'] > self.window:
+                entry = None
+            if entry is None:
+                entry = self._entries[key] = {'done': threading.Event(), 'response': None, 'finished_at': None}
+                return entry, True
+            return entry, False
+
+    def wait(self, entry, timeout=None):
+        """
+        The leader's response, or None if it is not shared.
+        Raises DeadlineExceeded if it does not come within `timeout`.
+        """
+        if not entry['done'].wait(timeout):
+            raise DeadlineExceeded('Timed out waiting for an identical in-flight call')
+        return entry['response']
+
+    def shareable(self, response):
+        if response.status_code != 200:
+            return False
+        if response._content_consumed:
+            return True
+        length = response.headers.get('Content-Length')
+        return length is not None and length.isdigit() and int(length) <= self.max_bytes
+
+    def finish(self, key, entry, response):
+        if response is not None and self.shareable(response):
+            # Read the body once for everybody
+            response.content
+            entry['response'] = response
+        with self._lock:
+            entry['finished_at'] = time.monotonic()
+            if entry['response'] is None or not self.window:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            # Forget expired entries
+            for other_key, other in list(self._entries.items()):
+                if other['finished_at'] is not None and entry['finished_at'] - other['finished_at'] > self.window:
+                    del self._entries[other_key]
+        entry['done'].set()
+
+class APIClient:
+    """
+    Pooled, keep-alive HTTP client for the backend API.
+
+    One instance lives per worker process (see get_api_client) so every
+    view reuses the same TCP connections instead of opening a new one per call.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_client_config()
+        self.timeout = (self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT'])
+        self.session = self._build_session()
+        self.breaker = CircuitBreaker(
+            failure_threshold=self.config['BREAKER_FAILURE_THRESHOLD'],
+            recovery_timeout=self.config['BREAKER_RECOVERY_TIMEOUT'],
+            half_open_probes=self.config['BREAKER_HALF_OPEN_PROBES'],
+        )
+        self.conditional = ConditionalGetStore(self.config['CONDITIONAL_MAX_ENTRIES'])
+        self.coalescer = GetCoalescer(self.config['COALESCE_WINDOW'], self.config['STREAM_CAPTURE_MAX_BYTES'])
+        self.retry_policy = RetryPolicy.from_config(self.config)
+        self.pool = BackendPool(
+            get_backend_urls(),
+            eject_threshold=self.config['BACKEND_EJECT_THRESHOLD'],
+            eject_duration=self.config['BACKEND_EJECT_DURATION'],
+        )
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config['POOL_CONNECTIONS'],
+            pool_maxsize=self.config['POOL_MAXSIZE'],
+            pool_block=self.config['POOL_BLOCK'],
+            max_retries=0,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def request(self, method, url, tenant=None, **kwargs):
+        """
+        Send a request through the pool and the circuit breaker, retrying
+        transient failures of idempotent methods (see RetryPolicy).
+
+        Authenticated GETs that pass their `tenant` are coalesced with
+        identical in-flight GETs of the same tenant (see GetCoalescer) and
+        made conditional: a 304 is answered from the locally cached copy.
+        With `stream=True` the body of a 200 is only cached by iter_items,
+        once fully read.
+
+        With a `deadline` (see Deadline), timeouts are capped at the time it
+        has left and DeadlineExceeded is raised once it is spent.
+        """
+        deadline = kwargs.get('deadline')
+        if deadline is not None:
+            deadline.check(url)
+        try:
+            return self._coalesced_request(method, url, tenant, **kwargs)
+        except requests.exceptions.Timeout as e:
+            if deadline is not None and deadline.expired and not isinstance(e, DeadlineExceeded):
+                deadline.degraded = True
+                raise DeadlineExceeded(f'Ran out of time for {url}') from e
+            raise
+
+    def _coalesced_request(self, method, url, tenant=None, **kwargs):
+        if method.upper() == 'GET' and tenant is not None and self.config['COALESCE_GETS']:
+            key = (tenant, url, repr(kwargs.get('params')))
+            entry, leader = self.coalescer.join(key)
+            if not leader:
+                deadline = kwargs.get('deadline')
+                response = self.coalescer.wait(entry, deadline.remaining() if deadline else None)
+                if response is not None:
+                    metrics.record_coalesced(url)
+                    return response
+                return self._request(method, url, tenant, **kwargs)
+            response = None
+            try:
+                response = self._request(method, url, tenant, **kwargs)
+                return response
+            finally:
+                self.coalescer.finish(key, entry, response)
+        return self._request(method, url, tenant, **kwargs)
+
+    def _request(self, method, url, tenant=None, **kwargs):
+        conditional = method.upper() == 'GET' and tenant is not None and self.config['CONDITIONAL_GET']
+        if conditional:
+            kwargs['headers'] = dict(kwargs.get('headers') or {})
+            kwargs['headers'].update(self.conditional.conditional_headers(tenant, url))
+
+        response = self._send_with_retry(method, url, **kwargs)
+
+        if conditional:
+            if response.status_code == 304:
+                response = self.conditional.replay(tenant, url, response) or response
+            elif response.status_code == 200:
+                if kwargs.get('stream'):
+                    response._conditional_key = (tenant, url)
+                else:
+                    self.conditional.store(tenant, url, response)
+        return response
+
+    def iter_items(self, response):
+        """
+        Yield the items of a JSON list response one at a time, without
+        holding the whole body and the whole decoded list in memory.
+
+        Bodies up to STREAM_CAPTURE_MAX_BYTES are still captured for the
+        conditional GET store; larger ones are not cached.
+        """
+        key = getattr(response, '_conditional_key', None)
+        limit = self.config['STREAM_CAPTURE_MAX_BYTES']
+        captured = [] if key and self.conditional.has_validators(response) else None
+        captured_size = 0
+
+        def chunks():
+            nonlocal captured, captured_size
+            for chunk in response.iter_content(chunk_size=self.config['STREAM_CHUNK_SIZE']):
+                if captured is not None:
+                    captured_size += len(chunk)
+                    if captured_size > limit:
+                        captured = None
+                    else:
+                        captured.append(chunk)
+                yield chunk
+
+        try:
+            yield from iter_json_array(chunks(), encoding=response.encoding or 'utf-8')
+        finally:
+            response.close()
+        if captured is not None:
+            self.conditional.store(key[0], key[1], response, content=b''.join(captured))
+
+    def _send_with_retry(self, method, url, deadline=None, **kwargs):
+        base_timeout = kwargs.get('timeout') or self.timeout
+        if deadline is not None:
+            kwargs['timeout'] = deadline.timeout(base_timeout)
+        policy = self.retry_policy
+        if not policy.applies_to(method):
+            return self._send(method, url, deadline=deadline, **kwargs)
+
+        started = time.monotonic()
+        attempt = 0
+        # Retries fail over to the other nodes of the pool first
+        avoid = set()
+        while True:
+            attempt += 1
+            try:
+                response = self._send(method, url, avoid, deadline, **kwargs)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                delay = policy.next_delay(attempt, started, deadline=deadline)
+                if delay is None:
+                    raise
+                reason = type(e).__name__
+                avoid.add(getattr(e, 'api_node', None))
+            else:
+                if attempt == 1:
+                    policy.budget.deposit(self.config['RETRY_BUDGET_RATIO'])
+                if response.status_code not in policy.statuses:
+                    return response
+                delay = policy.next_delay(attempt, started, response, deadline)
+                if delay is None:
+                    return response
+                reason = f"http_{response.status_code}"
+                avoid.add(response.api_node)
+                response.close()
+            metrics.record_retry(url, reason)
+            time.sleep(delay)
+            if deadline is not None:
+                kwargs['timeout'] = deadline.timeout(base_timeout)
+
+    def _send(self, method, url, avoid=(), deadline=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.record_short_circuit(method, url)
+            raise
+
+        # Metrics, conditional GETs and coalescing keep using the logical URL
+        node, node_url = self.pool.acquire(url, avoid)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method=method, url=node_url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if isinstance(e, requests.exceptions.Timeout) and deadline is not None and deadline.expired:
+                # Cut short by the request's own time budget, not the backend's fault
+                self.pool.release(node, None)
+                metrics.observe_api_call(method, url, time.monotonic() - started, 'deadline')
+                self.breaker.record_cancelled()
+                deadline.degraded = True
+                raise DeadlineExceeded(f'Ran out of time for {url}') from e
+            e.api_node = node
+            self.pool.release(node, False)
+            metrics.observe_api_call(method, url, time.monotonic() - started, 'error')
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            # Not the node's fault (bad URL, bad arguments), but a half-open
+            # probe has to be given back or the breaker never closes again
+            self.pool.release(node, True)
+            self.breaker.record_cancelled()
+            raise
+        response.api_node = node
+        self.pool.release(node, not is_failure_status(response.status_code))
+        metrics.observe_api_call(method, url, time.monotonic() - started, response.status_code)
+
+        if is_failure_status(response.status_code):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def probe(self, method, url, **kwargs):
+        """
+        Call the backend bypassing the circuit breaker and the pool (health
+        checks of one node)
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method=method, url=url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def options(self, url, **kwargs):
+        return self.request('OPTIONS', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_api_client():
+    """
+    Return the API client of the current worker process.
+
+    The client is rebuilt after a fork so gunicorn workers never share
+    pooled sockets inherited from the master process.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = APIClient()
+                _client_pid = pid
+    return _client
+
+def get_retry_budget():
+    """
+    Worker-wide budget of API client retries, also spent by bulk operations
+    """
+    return get_api_client().retry_policy.budget
+
+def get_breaker_state():
+    """
+    Circuit breaker state of this worker: 'closed', 'open' or 'half_open'
+    """
+    return get_api_client().breaker.state
+
+def _breaker_metric():
+    return {(): 1 if get_breaker_state() == CircuitBreaker.OPEN else 0}
+
+def _conditional_metric():
+    endpoints = get_api_client().conditional.get_stats()['endpoints']
+    return {(endpoint,): stats['bytes_saved'] for endpoint, stats in endpoints.items()}
+
+def _backend_metric(field):
+    def collect():
+        return {(node['base_url'],): int(node[field]) for node in get_api_client().pool.snapshot()}
+    return collect
+
+metrics.register(metrics.CallbackMetric(
+    'asiria_api_backend_outstanding', 'In-flight calls per backend API node.',
+    'gauge', ('node',), _backend_metric('outstanding'),
+))
+metrics.register(metrics.CallbackMetric(
+    'asiria_api_backend_ejected', 'Whether a backend API node is ejected from the pool.',
+    'gauge', ('node',), _backend_metric('ejected'),
+))
+metrics.register(metrics.CallbackMetric(
+    'asiria_api_circuit_open', 'Whether the backend API circuit breaker is open.',
+    'gauge', (), _breaker_metric,
+))
+metrics.register(metrics.CallbackMetric(
+    'asiria_api_conditional_bytes_saved_total', 'Response bytes served locally after a 304.',
+    'counter', ('endpoint',), _conditional_metric,
+))
+
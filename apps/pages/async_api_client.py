@@ -0,0 +1,231 @@
+import asyncio
+import time
+import weakref
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+
+from . import metrics
+from .api_client import CircuitOpenError, DeadlineExceeded, get_api_client, get_client_config, is_failure_status
+from .utils import APIResult, refresh_api_token, token_expires_soon
+
+class AsyncAPIClient:
+    """
+    asyncio-native counterpart of APIClient, built on httpx.AsyncClient.
+
+    Used by the async views under an ASGI server, where one worker can keep
+    many requests waiting on the backend at the same time.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or get_client_config()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.config['READ_TIMEOUT'], connect=self.config['CONNECT_TIMEOUT']),
+            limits=httpx.Limits(
+                max_connections=self.config['POOL_MAXSIZE'],
+                max_keepalive_connections=self.config['POOL_CONNECTIONS'],
+            ),
+        )
+
+    async def request(self, method, url, deadline=None, **kwargs):
+        """
+        Send a request, retrying transient failures like APIClient does; the
+        retry policy and budget are shared with the sync client of this worker.
+        A `deadline` caps the timeouts like in APIClient.request.
+        """
+        if deadline is not None:
+            deadline.check(url)
+        try:
+            return await self._request(method, url, deadline, **kwargs)
+        except httpx.TimeoutException as e:
+            if deadline is not None and deadline.expired:
+                deadline.degraded = True
+                raise DeadlineExceeded(f'Ran out of time for {url}') from e
+            raise
+
+    def _timeout(self, deadline):
+        remaining = deadline.remaining()
+        return httpx.Timeout(
+            min(self.config['READ_TIMEOUT'], remaining),
+            connect=min(self.config['CONNECT_TIMEOUT'], remaining),
+        )
+
+    async def _request(self, method, url, deadline, **kwargs):
+        if deadline is not None:
+            kwargs['timeout'] = self._timeout(deadline)
+        policy = get_api_client().retry_policy
+        if not policy.applies_to(method):
+            return await self._send(method, url, deadline=deadline, **kwargs)
+
+        started = time.monotonic()
+        attempt = 0
+        avoid = set()
+        while True:
+            attempt += 1
+            try:
+                response = await self._send(method, url, avoid, deadline, **kwargs)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except httpx.TransportError as e:
+                delay = policy.next_delay(attempt, started, deadline=deadline)
+                if delay is None:
+                    raise
+                reason = type(e).__name__
+                avoid.add(getattr(e, 'api_node', None))
+            else:
+                if attempt == 1:
+                    policy.budget.deposit(self.config['RETRY_BUDGET_RATIO'])
+                if response.status_code not in policy.statuses:
+                    return response
+                delay = policy.next_delay(attempt, started, response, deadline)
+                if delay is None:
+                    return response
+                reason = f"http_{response.status_code}"
+                avoid.add(response.api_node)
+                await response.aclose()
+            metrics.record_retry(url, reason)
+            await asyncio.sleep(delay)
+            if deadline is not None:
+                kwargs['timeout'] = self._timeout(deadline)
+
+    async def _send(self, method, url, avoid=(), deadline=None, **kwargs):
+        # Share the circuit breaker of the sync client of this worker
+        breaker = get_api_client().breaker
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            metrics.record_short_circuit(method, url)
+            raise
+
+        # Same backend pool, and so the same load and ejection state, as the sync client
+        pool = get_api_client().pool
+        node, node_url = pool.acquire(url, avoid)
+        started = time.monotonic()
+        try:
+            response = await self.client.request(method, node_url, **kwargs)
+        except httpx.TransportError as e:
+            if isinstance(e, httpx.TimeoutException) and deadline is not None and deadline.expired:
+                # Cut short by the request's own time budget, not the backend's fault
+                pool.release(node, None)
+                metrics.observe_api_call(method, url, time.monotonic() - started, 'deadline')
+                breaker.record_cancelled()
+                deadline.degraded = True
+                raise DeadlineExceeded(f'Ran out of time for {url}') from e
+            e.api_node = node
+            pool.release(node, False)
+            metrics.observe_api_call(method, url, time.monotonic() - started, 'error')
+            breaker.record_failure()
+            raise
+        except Exception:
+            pool.release(node, True)
+            breaker.record_cancelled()
+            raise
+        response.api_node = node
+        pool.release(node, not is_failure_status(response.status_code))
+        metrics.observe_api_call(method, url, time.monotonic() - started, response.status_code)
+
+        if is_failure_status(response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+# httpx clients are bound to the event loop that created them
+_clients = weakref.WeakKeyDictionary()
+
+def get_async_api_client():
+    """
+    Return the async API client of the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncAPIClient()
+    return client
+
+def _session_get(request, key):
+    return request.session.get(key)
+
+async def aget_api_headers(request):
+    """
+    Async variant of utils.get_api_headers
+    """
+    headers = {
+        'Content-Type': 'application/json',
+    }
+    access_token = await sync_to_async(_session_get)(request, 'access_token')
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+    return headers
+
+async def arefresh_api_token(request, clear_on_failure=True):
+    """
+    Async variant of utils.refresh_api_token.
+
+    Runs the sync implementation in a thread so that async and sync callers
+    share the same single-flight refresh.
+    """
+    return await sync_to_async(refresh_api_token, thread_sensitive=False)(request, clear_on_failure)
+
+async def amake_authenticated_request(request, method, url, data=None, **kwargs):
+    """
+    Async variant of utils.make_authenticated_request
+    """
+    client = get_async_api_client()
+    if await sync_to_async(token_expires_soon)(request):
+        await arefresh_api_token(request, clear_on_failure=False)
+
+    headers = await aget_api_headers(request)
+    # Time budget of the whole Django request, see middleware.open_request_scope
+    kwargs.setdefault('deadline', getattr(request, 'api_deadline', None))
+    response = await client.request(method, url, json=data, headers=headers, **kwargs)
+
+    if response.status_code == 401:
+        if await arefresh_api_token(request):
+            headers = await aget_api_headers(request)
+            response = await client.request(method, url, json=data, headers=headers, **kwargs)
+
+    return response
+
+async def _afetch_one(request, name, url, consumer=None):
+    try:
+        response = await amake_authenticated_request(request, 'GET', url)
+    except DeadlineExceeded as e:
+        return APIResult(name, APIResult.SKIPPED, error=e)
+    except (httpx.TransportError, requests.exceptions.ConnectionError) as e:
+        # includes CircuitOpenError
+        return APIResult(name, APIResult.OFFLINE, error=e)
+    except Exception as e:
+        return APIResult(name, APIResult.ERROR, error=e)
+
+    if response.status_code != 200:
+        return APIResult(name, APIResult.HTTP_ERROR, response=response)
+    try:
+        data = response.json()
+        if consumer is not None:
+            data = consumer(iter(data))
+        return APIResult(name, APIResult.OK, response=response, data=data)
+    except ValueError as e:
+        return APIResult(name, APIResult.ERROR, response=response, error=e)
+
+async def afetch_many(request, calls, consumers=None):
+    """
+    Async variant of utils.fetch_many, using asyncio.gather instead of threads.
+    Consumers get the same item iterator, over the fully decoded body.
+    """
+    consumers = consumers or {}
+    names = list(calls)
+    results = await asyncio.gather(*(
+        _afetch_one(request, name, calls[name], consumers.get(name)) for name in names
+    ))
+    return dict(zip(names, results))
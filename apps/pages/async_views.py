@@ -0,0 +1,127 @@
+"""
+Async versions of the I/O-bound views in views.py.
+
+They are routed instead of their sync counterparts when ASYNC_VIEWS is
+enabled (see urls.py) and are meant to run under an ASGI server, where a
+worker keeps serving other tills while these wait on the backend API.
+Rendering, forms and session writes are shared with views.py and run via
+sync_to_async, because they touch the database.
+"""
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, redirect
+from django.http import JsonResponse
+
+from .forms import RegistrationForm, LoginForm
+from .decorators import api_deadline, api_login_required
+from .utils import store_api_session
+from .api_client import CircuitOpenError, DeadlineExceeded
+from .async_api_client import get_async_api_client, amake_authenticated_request
+from .catalog_mirror import afetch_with_catalog_mirror
+from .views import (
+    API_BASE, TODAYS_SALES_DEADLINE, PAGE_DEADLINE, INVENTORY_CALLS, PRODUCT_MANAGEMENT_CALLS, PRODUCT_CONSUMERS,
+    _inventory_context, _product_management_context,
+    _registration_payload, _login_error_message,
+)
+
+arender = sync_to_async(render)
+
+@api_login_required
+@api_deadline(TODAYS_SALES_DEADLINE)
+async def get_todays_sales(request):
+    """
+    Fetch today's sales data from the API
+    """
+    try:
+        response = await amake_authenticated_request(request, 'GET', f"{API_BASE}sales/today/")
+
+        if response.status_code == 200:
+            return JsonResponse(response.json())
+        else:
+            return JsonResponse(
+                {'error': f'API Error: {response.status_code}'},
+                status=response.status_code
+            )
+    except CircuitOpenError:
+        # Fail fast while the backend is known to be down
+        return JsonResponse({'error': 'Backend API is offline'}, status=503)
+    except DeadlineExceeded:
+        return JsonResponse({'error': 'Backend API is too slow'}, status=504)
+    except Exception as e:
+        return JsonResponse(
+            {'error': f'Connection Error: {str(e)}'},
+            status=500
+        )
+
+async def register(request):
+    success_message = None
+    error_message = None
+    if request.method == 'POST':
+        form = RegistrationForm(request.POST)
+        if form.is_valid():
+            try:
+                response = await get_async_api_client().post(f"{API_BASE}clients/", json=_registration_payload(form))
+                if response.status_code == 201:
+                    success_message = 'Registration successful! You can now log in.'
+                    form = RegistrationForm()  # Reset the form
+                else:
+                    error_message = f"API Error: {response.status_code} {response.text}"
+            except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+                # includes CircuitOpenError
+                error_message = f"API Connection Error: {e}"
+        else:
+            error_message = "Form validation failed. Please correct the errors below."
+    else:
+        form = RegistrationForm()
+    return await arender(request, 'accounts/register.html', {'form': form, 'success_message': success_message, 'error_message': error_message})
+
+async def login(request):
+    success_message = None
+    error_message = None
+    if request.method == 'POST':
+        form = LoginForm(request.POST)
+        if form.is_valid():
+            data = {
+                'phone_number': form.cleaned_data['phone_number'],
+                'password': form.cleaned_data['password'],
+            }
+            try:
+                response = await get_async_api_client().post(f"{API_BASE}token/", json=data)
+                if response.status_code == 200:
+                    await sync_to_async(store_api_session)(request, response.json())
+                    return redirect('index')
+                else:
+                    error_message = _login_error_message(response)
+            except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+                # includes CircuitOpenError
+                error_message = f"API Connection Error: {e}"
+        else:
+            error_message = "Please correct the errors below."
+    else:
+        form = LoginForm()
+
+    return await arender(request, 'accounts/login.html', {
+        'form': form,
+        'success_message': success_message,
+        'error_message': error_message
+    })
+
+@api_login_required
+@api_deadline(PAGE_DEADLINE)
+async def inventory(request):
+    results, synced_at = await afetch_with_catalog_mirror(request, INVENTORY_CALLS, PRODUCT_CONSUMERS)
+    context = _inventory_context(results)
+    context["catalog_synced_at"] = synced_at
+    context["import_job_id"] = await sync_to_async(request.session.get)("product_import_job")
+    return await arender(request, "pages/inventory.html", context)
+
+@api_login_required
+@api_deadline(PAGE_DEADLINE)
+async def product_management(request):
+    """Show product management dashboard with categories, units, alerts, etc."""
+    results, synced_at = await afetch_with_catalog_mirror(request, PRODUCT_MANAGEMENT_CALLS, PRODUCT_CONSUMERS)
+    context = _product_management_context(results)
+    context["catalog_synced_at"] = synced_at
+    return await arender(request, "pages/product_management.html", context)
@@ -0,0 +1,129 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class BackendNode:
+    """
+    One backend API instance, identified by its base URL (".../api/")
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0   # time.monotonic()
+        self.ejected_at = None     # time.time(), to order against health probes
+        self.requests = 0
+
+    def snapshot(self, now):
+        return {
+            'base_url': self.base_url,
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'consecutive_failures': self.failures,
+            'ejected': self.ejected_until > now,
+        }
+
+class BackendPool:
+    """
+    Balances backend API calls over several nodes.
+
+    URLs are built against the logical `base_url` (the first node) and mapped
+    to a node per call: the available node with the fewest outstanding
+    requests, ties broken at random. A node failing `eject_threshold` calls
+    in a row, or reported offline by the health monitor, is ejected for
+    `eject_duration` seconds; when it comes back a single failure ejects it
+    again. If every node is ejected, the one due back first is used.
+    """
+
+    def __init__(self, base_urls, eject_threshold=3, eject_duration=30):
+        if not base_urls:
+            raise ValueError('At least one API backend is required')
+        self.nodes = [BackendNode(url if url.endswith('/') else url + '/') for url in base_urls]
+        self.eject_threshold = eject_threshold
+        self.eject_duration = eject_duration
+        self._lock = threading.Lock()
+        self._health_checked_at = 0.0
+
+    @property
+    def base_url(self):
+        return self.nodes[0].base_url
+
+    def _path(self, url):
+        for node in self.nodes:
+            if url.startswith(node.base_url):
+                return url[len(node.base_url):]
+        return None
+
+    def acquire(self, url, avoid=()):
+        """
+        Pick a node for `url`, other than the `avoid` ones if possible.
+        Returns (node, URL on that node); node is None for URLs outside the
+        pool, which are sent unchanged.
+        """
+        path = self._path(url)
+        if path is None:
+            return None, url
+        with self._lock:
+            now = time.monotonic()
+            candidates = [node for node in self.nodes if node.ejected_until <= now]
+            if not candidates:
+                candidates = [min(self.nodes, key=lambda node: node.ejected_until)]
+            candidates = [node for node in candidates if node not in avoid] or candidates
+            fewest = min(node.outstanding for node in candidates)
+            node = random.choice([node for node in candidates if node.outstanding == fewest])
+            node.outstanding += 1
+            node.requests += 1
+        return node, node.base_url + path
+
+    def release(self, node, ok):
+        """
+        Report the outcome of a call made on `node`; ok=None for a call cut
+        short by its caller, which says nothing about the node
+        """
+        if node is None:
+            return
+        with self._lock:
+            node.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                node.failures = 0
+                return
+            node.failures += 1
+            if node.failures >= self.eject_threshold:
+                self._eject(node)
+
+    def _eject(self, node):
+        if node.ejected_until <= time.monotonic():
+            logger.warning('Ejecting API backend %s for %ss', node.base_url, self.eject_duration)
+        node.ejected_until = time.monotonic() + self.eject_duration
+        node.ejected_at = time.time()
+        # Back in rotation on probation: one more failure ejects it again
+        node.failures = self.eject_threshold - 1
+
+    def apply_health(self, statuses, checked_at):
+        """
+        Apply a health monitor result ({base_url: 'Online' | 'Offline'})
+        checked at `checked_at` (time.time()); older results are ignored
+        """
+        with self._lock:
+            if checked_at <= self._health_checked_at:
+                return
+            self._health_checked_at = checked_at
+            for node in self.nodes:
+                status = statuses.get(node.base_url)
+                if status == 'Offline':
+                    self._eject(node)
+                elif status == 'Online' and node.ejected_at is not None and node.ejected_at < checked_at:
+                    node.ejected_until = 0.0
+                    node.ejected_at = None
+                    node.failures = 0
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            return [node.snapshot(now) for node in self.nodes]
@@ -0,0 +1,122 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+from . import metrics
+from .api_client import CircuitOpenError, DeadlineExceeded, RetryBudget, backoff_delay, get_retry_budget
+from .utils import make_authenticated_request
+
+def get_bulk_config():
+    config = {
+        'CONCURRENCY' : 8,     # parallel backend calls per bulk operation
+        'MAX_ATTEMPTS': 3,     # attempts per item, first one included
+        'RETRY_BUDGET': 0.2,   # retries allowed for the whole batch, as a share of its size
+        'BACKOFF'     : 0.25,  # base delay before a retry, in seconds
+    }
+    config.update(getattr(settings, 'BULK_OPERATIONS', {}))
+    return config
+
+class BulkResult:
+    """
+    Per-ID outcome of a bulk operation
+    """
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = {}
+
+    def summary(self, verb='processed', limit=5):
+        text = f"{verb} {len(self.succeeded)} / failed {len(self.failed)}"
+        if self.failed:
+            details = ", ".join(f"{item_id} ({reason})" for item_id, reason in list(self.failed.items())[:limit])
+            more = len(self.failed) - limit
+            text += f": {details}" + (f" and {more} more" if more > 0 else "")
+        return text
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+def _is_retryable_status(method, status_code):
+    # 429/503 mean the backend did not process the request
+    if status_code in (429, 503):
+        return True
+    return method in IDEMPOTENT_METHODS and status_code >= 500
+
+def _is_retryable_error(method, error):
+    # The request is out of time: a retry could not finish either
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return False
+    if method in IDEMPOTENT_METHODS:
+        return True
+    # A POST may have reached the backend: only retry when it surely did not
+    return isinstance(error, requests.exceptions.ConnectTimeout)
+
+def send_with_retry(request, method, url, data=None, config=None, budget=None):
+    """
+    Send one backend write, retrying transient failures with exponential
+    backoff and jitter while `budget` allows.
+
+    Returns (response, None) on a response that is not retried, or
+    (None, reason) when the call could not be completed.
+    """
+    config = config or get_bulk_config()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            resp = make_authenticated_request(request, method, url, data=data)
+            if not _is_retryable_status(method, resp.status_code):
+                return resp, None
+            reason = f"HTTP {resp.status_code}"
+            retryable = True
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            reason = type(e).__name__
+            retryable = _is_retryable_error(method, e)
+
+        if not retryable or attempt >= config['MAX_ATTEMPTS'] or (budget and not budget.spend()):
+            return None, reason
+        # The worker-wide budget caps retries across all concurrent batches
+        if not get_retry_budget().spend():
+            return None, reason
+        metrics.record_retry(url, 'transient')
+        time.sleep(backoff_delay(config['BACKOFF'], attempt))
+
+def _delete_one(request, url, config, budget):
+    """
+    DELETE `url`. Returns None or a failure reason.
+    """
+    resp, reason = send_with_retry(request, "DELETE", url, config=config, budget=budget)
+    if resp is None:
+        return reason
+    if resp.status_code in (200, 204):
+        return None
+    # Already gone, e.g. deleted by a retried attempt or another till
+    if resp.status_code == 404:
+        return None
+    return f"HTTP {resp.status_code}"
+
+def bulk_delete(request, urls_by_id):
+    """
+    Send the DELETEs of `urls_by_id` ({id: url}) concurrently, with bounded
+    concurrency and a retry budget shared by the whole batch
+    """
+    config = get_bulk_config()
+    result = BulkResult()
+    if not urls_by_id:
+        return result
+
+    budget = RetryBudget(max(1, int(len(urls_by_id) * config['RETRY_BUDGET'])))
+    workers = max(1, min(config['CONCURRENCY'], len(urls_by_id)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-bulk') as pool:
+        futures = {
+            item_id: pool.submit(_delete_one, request, url, config, budget)
+            for item_id, url in urls_by_id.items()
+        }
+        for item_id, future in futures.items():
+            reason = future.result()
+            if reason is None:
+                result.succeeded.append(item_id)
+            else:
+                result.failed[item_id] = reason
+    return result
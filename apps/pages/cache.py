@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.core.cache import caches
+
+class SWRCache:
+    """
+    TTL cache with stale-while-revalidate on top of a Django cache backend.
+
+    Entries younger than `ttl` are served as hits. Entries up to
+    `ttl + stale_ttl` old are still served, but trigger one background
+    refresh per key. Older entries are misses. With a shared cache backend
+    (Redis, Memcached, DB) entries are visible to every worker; the default
+    LocMemCache keeps them per process.
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+    def __init__(self, name, ttl, stale_ttl=0, alias='default'):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.alias = alias
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def lookup(self, key):
+        """
+        Return (state, value) where state is FRESH, STALE or MISS
+        """
+        entry = self.backend.get(self._key(key))
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            if age < self.ttl:
+                self._count('hits')
+                return self.FRESH, entry['value']
+            if age < self.ttl + self.stale_ttl:
+                self._count('stale_hits')
+                return self.STALE, entry['value']
+        self._count('misses')
+        return self.MISS, None
+
+    def set(self, key, value):
+        entry = {'value': value, 'fetched_at': time.time()}
+        self.backend.set(self._key(key), entry, timeout=self.ttl + self.stale_ttl)
+
+    def invalidate(self, key):
+        self._count('invalidations')
+        self.backend.delete(self._key(key))
+
+    def refresh_in_background(self, key, fetch):
+        """
+        Re-run `fetch` in a thread and store its result, unless it returns None.
+        Concurrent refreshes of the same key are collapsed into one.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                value = fetch()
+                if value is not None:
+                    self.set(key, value)
+                    self._count('refreshes')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value, fetching it synchronously on a miss
+        """
+        state, value = self.lookup(key)
+        if state == self.STALE:
+            self.refresh_in_background(key, fetch)
+        if state != self.MISS:
+            return value
+        value = fetch()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale_hits']) / lookups, 4) if lookups else 0.0
+        return stats
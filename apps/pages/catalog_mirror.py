@@ -0,0 +1,261 @@
+"""
+Local read model of each tenant's backend product catalog.
+
+The first read of a tenant populates the mirror in bulk; afterwards reads
+are served from the database and, once older than SYNC_INTERVAL, trigger a
+delta sync in the background: the product list is fetched and diffed
+against the stored content hashes, so only changed rows are written.
+Writes made through this app update the mirror in place.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CatalogMirrorState, MirroredProduct
+from .reference_data import afetch_with_reference_cache, fetch_with_reference_cache
+from .utils import APIResult, detached_request, fetch_many
+
+logger = logging.getLogger(__name__)
+
+def get_mirror_config():
+    config = {
+        'ENABLED'       : True,
+        'SYNC_INTERVAL' : 60,    # seconds before a read triggers a delta sync
+        'BATCH_SIZE'    : 500,   # rows per bulk insert / update
+    }
+    config.update(getattr(settings, 'CATALOG_MIRROR', {}))
+    return config
+
+def content_hash(product):
+    return hashlib.sha1(json.dumps(product, sort_keys=True, default=str).encode()).hexdigest()
+
+def _tenant(request):
+    return request.session.get('user_client_id')
+
+# ----------------- Sync -----------------
+
+class _Diff:
+    """
+    Consumer of the streamed product list: sorts items into new / changed
+    rows against the stored hashes, one item at a time
+    """
+
+    def __init__(self, user_client, known_hashes, synced_at):
+        self.user_client = user_client
+        self.known = known_hashes
+        self.synced_at = synced_at
+        self.seen = set()
+        self.created = []
+        self.changed = {}
+
+    def __call__(self, items):
+        for product in items:
+            product_id = str(product.get('product_id') or '')
+            if not product_id or product_id in self.seen:
+                continue
+            self.seen.add(product_id)
+            digest = content_hash(product)
+            known = self.known.get(product_id)
+            if known is None:
+                self.created.append(MirroredProduct(
+                    user_client=self.user_client, product_id=product_id,
+                    data=product, content_hash=digest, synced_at=self.synced_at,
+                ))
+            elif known != digest:
+                self.changed[product_id] = (product, digest)
+        return self
+
+def sync_catalog(request, products_url):
+    """
+    Bring the mirror of the request's tenant in line with the backend.
+    Returns {'created', 'updated', 'deleted', 'unchanged'} or None when
+    the product list could not be fetched.
+    """
+    user_client = _tenant(request)
+    config = get_mirror_config()
+    now = timezone.now()
+    known = dict(MirroredProduct.objects.filter(user_client=user_client).values_list('product_id', 'content_hash'))
+
+    result = fetch_many(request, {'products': products_url}, {'products': _Diff(user_client, known, now)})['products']
+    if not result.ok:
+        logger.warning('Catalog mirror sync of %s failed: %s', user_client, result)
+        return None
+    diff = result.data
+
+    removed = [product_id for product_id in known if product_id not in diff.seen]
+    with transaction.atomic():
+        # Another worker may have mirrored the same rows meanwhile
+        MirroredProduct.objects.bulk_create(diff.created, batch_size=config['BATCH_SIZE'], ignore_conflicts=True)
+        if diff.changed:
+            rows = list(MirroredProduct.objects.filter(user_client=user_client, product_id__in=list(diff.changed)))
+            for row in rows:
+                row.data, row.content_hash = diff.changed[row.product_id]
+                row.synced_at = now
+            MirroredProduct.objects.bulk_update(rows, ['data', 'content_hash', 'synced_at'], batch_size=config['BATCH_SIZE'])
+        for start in range(0, len(removed), config['BATCH_SIZE']):
+            MirroredProduct.objects.filter(
+                user_client=user_client, product_id__in=removed[start:start + config['BATCH_SIZE']],
+            ).delete()
+        CatalogMirrorState.objects.get_or_create(user_client=user_client)
+        changes = {'version': F('version') + 1} if (diff.created or diff.changed or removed) else {}
+        CatalogMirrorState.objects.filter(user_client=user_client).update(
+            synced_at=now, product_count=len(diff.seen), stale=False, **changes,
+        )
+
+    return {
+        'created': len(diff.created),
+        'updated': len(diff.changed),
+        'deleted': len(removed),
+        'unchanged': len(diff.seen) - len(diff.created) - len(diff.changed),
+    }
+
+_syncing = set()
+_syncing_lock = threading.Lock()
+_tenant_locks = {}
+
+def _sync_lock(user_client):
+    """
+    Serializes the syncs of one tenant within this worker
+    """
+    with _syncing_lock:
+        return _tenant_locks.setdefault(user_client, threading.Lock())
+
+def sync_in_background(request, products_url):
+    """
+    Delta sync in a thread; at most one per tenant at a time in this worker
+    """
+    user_client = _tenant(request)
+    with _syncing_lock:
+        if user_client in _syncing:
+            return
+        _syncing.add(user_client)
+
+    api_request = detached_request(request)
+
+    def _sync():
+        try:
+            with _sync_lock(user_client):
+                sync_catalog(api_request, products_url)
+        except Exception:
+            logger.exception('Catalog mirror sync of %s failed', user_client)
+        finally:
+            with _syncing_lock:
+                _syncing.discard(user_client)
+            # This thread's DB connection is not managed by the request cycle
+            connection.close()
+
+    threading.Thread(target=_sync, name=f"catalog-sync-{user_client}", daemon=True).start()
+
+# ----------------- Reads -----------------
+
+def get_mirrored_products(request, products_url):
+    """
+    Return (products, synced_at) from the mirror, populating it on first
+    access. (None, None) if the mirror is empty and the backend is unreachable.
+    """
+    user_client = _tenant(request)
+    state = CatalogMirrorState.objects.filter(user_client=user_client).first()
+    if state is None or state.synced_at is None:
+        # Concurrent first readers wait for one bulk load
+        with _sync_lock(user_client):
+            state = CatalogMirrorState.objects.filter(user_client=user_client).first()
+            if state is None or state.synced_at is None:
+                if sync_catalog(request, products_url) is None:
+                    return None, None
+                state = CatalogMirrorState.objects.get(user_client=user_client)
+    else:
+        age = (timezone.now() - state.synced_at).total_seconds()
+        if state.stale or age >= get_mirror_config()['SYNC_INTERVAL']:
+            sync_in_background(request, products_url)
+
+    products = list(
+        MirroredProduct.objects.filter(user_client=user_client)
+        .order_by('id').values_list('data', flat=True)
+    )
+    return products, state.synced_at
+
+def fetch_with_catalog_mirror(request, calls, consumers=None):
+    """
+    Same as reference_data.fetch_with_reference_cache, but the `products`
+    call is answered from the local mirror (and its consumer run over it).
+    Returns (results, synced_at); synced_at is None when products were not
+    served from the mirror.
+    """
+    consumers = consumers or {}
+    if 'products' not in calls or not get_mirror_config()['ENABLED']:
+        return fetch_with_reference_cache(request, calls, consumers), None
+
+    products, synced_at = get_mirrored_products(request, calls['products'])
+    if products is None:
+        # Nothing mirrored yet and the sync failed: report the live call's error
+        return fetch_with_reference_cache(request, calls, consumers), None
+
+    others = {name: url for name, url in calls.items() if name != 'products'}
+    results = fetch_with_reference_cache(request, others, consumers)
+    consumer = consumers.get('products')
+    results['products'] = APIResult('products', APIResult.OK, data=consumer(iter(products)) if consumer else products)
+    return {name: results[name] for name in calls}, synced_at
+
+async def afetch_with_catalog_mirror(request, calls, consumers=None):
+    """
+    Async variant of fetch_with_catalog_mirror; the mirror is read in a thread
+    """
+    consumers = consumers or {}
+    if 'products' not in calls or not get_mirror_config()['ENABLED']:
+        return await afetch_with_reference_cache(request, calls, consumers), None
+
+    products, synced_at = await sync_to_async(get_mirrored_products)(request, calls['products'])
+    if products is None:
+        return await afetch_with_reference_cache(request, calls, consumers), None
+
+    others = {name: url for name, url in calls.items() if name != 'products'}
+    results = await afetch_with_reference_cache(request, others, consumers)
+    consumer = consumers.get('products')
+    results['products'] = APIResult('products', APIResult.OK, data=consumer(iter(products)) if consumer else products)
+    return {name: results[name] for name in calls}, synced_at
+
+# ----------------- Writes -----------------
+
+def mirror_upsert(request, product):
+    """
+    Store a product just created or updated through the backend
+    """
+    product_id = str(product.get('product_id') or '')
+    if not product_id:
+        mark_stale(_tenant(request))
+        return
+    MirroredProduct.objects.update_or_create(
+        user_client=_tenant(request), product_id=product_id,
+        defaults={'data': product, 'content_hash': content_hash(product), 'synced_at': timezone.now()},
+    )
+    _bump_version(_tenant(request))
+
+def mirror_delete(request, product_ids):
+    if not product_ids:
+        return
+    MirroredProduct.objects.filter(user_client=_tenant(request), product_id__in=[str(p) for p in product_ids]).delete()
+    _bump_version(_tenant(request))
+
+def _bump_version(user_client):
+    CatalogMirrorState.objects.filter(user_client=user_client).update(version=F('version') + 1)
+
+def get_catalog_version(user_client):
+    """
+    (version, synced_at) of the tenant's mirror, or (None, None) before its first sync
+    """
+    state = CatalogMirrorState.objects.filter(user_client=user_client).values_list('version', 'synced_at').first()
+    return state if state and state[1] is not None else (None, None)
+
+def mark_stale(user_client):
+    """
+    Have the next read re-sync the tenant's mirror (e.g. after a CSV import)
+    """
+    CatalogMirrorState.objects.filter(user_client=user_client).update(stale=True)
@@ -1,15 +1,13 @@
-import requests
 from django.conf import settings
 from django.utils import timezone
 
+from .health import ensure_health_monitor, get_api_status, get_api_url
+
 def global_context(request):
-    # API liveness
-    api_url = getattr(settings, 'API_URL', 'http://127.0.0.1:8080/api/')
-    try:
-        response = requests.options(api_url, timeout=2)
-        api_status = 'Online' if response.status_code in [200, 204, 401, 403, 405] else 'Offline'
-    except Exception:
-        api_status = 'Offline'
+    # API liveness, as last published by the background health monitor
+    ensure_health_monitor()
+    api_url = get_api_url()
+    api_status = get_api_status()
 
     # Example: unread notifications (placeholder, replace with your model/query)
     unread_notifications = 0
@@ -26,8 +24,13 @@ def global_context(request):
     # Maintenance mode (placeholder, could be from settings or DB)
     maintenance_mode = getattr(settings, 'MAINTENANCE_MODE', False)
 
+    # Some backend calls of this request were skipped or cut short by its deadline
+    deadline = getattr(request, 'api_deadline', None)
+    api_degraded = bool(deadline and deadline.degraded)
+
     return {
         'api_status': api_status,
+        'api_degraded': api_degraded,
         'api_url': api_url,
         'site_name': getattr(settings, 'SITE_NAME', 'AsiriaPOS'),
         'current_time': timezone.now(),
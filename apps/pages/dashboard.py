@@ -0,0 +1,142 @@
+"""
+Dashboard KPIs in one snapshot per tenant.
+
+The backend calls (today's sales, stock alerts) are made in parallel and
+the product KPIs are computed from the local catalog mirror. Snapshots are
+cached for a short TTL with stale-while-revalidate, so refreshing the
+dashboard does not reach the backend; a stale snapshot is served while one
+background refresh replaces it.
+"""
+
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics
+from .api_client import get_api_base
+from .cache import SWRCache
+from .catalog_mirror import fetch_with_catalog_mirror
+from .utils import detached_request
+
+def _build_cache():
+    config = getattr(settings, 'DASHBOARD_SNAPSHOT', {})
+    return SWRCache(
+        'dashboard',
+        ttl=config.get('TTL', 30),
+        stale_ttl=config.get('STALE_TTL', 300),
+    )
+
+dashboard_cache = _build_cache()
+
+def _cache_metric():
+    stats = dashboard_cache.get_stats()
+    return {(result,): stats[result] for result in ('hits', 'stale_hits', 'misses')}
+
+metrics.register(metrics.CallbackMetric(
+    'asiria_dashboard_cache_lookups_total', 'Dashboard snapshot cache lookups, by result.',
+    'counter', ('result',), _cache_metric,
+))
+
+def _decimal(value):
+    try:
+        return Decimal(str(value if value not in (None, '') else 0))
+    except InvalidOperation:
+        return Decimal(0)
+
+class _ProductKPIs:
+    """
+    Consumer of the product list: stock KPIs in one pass
+    """
+
+    def __call__(self, items):
+        count = low_stock = out_of_stock = 0
+        cost_value = retail_value = Decimal(0)
+        for product in items:
+            count += 1
+            stock = _decimal(product.get('stock'))
+            if stock <= 0:
+                out_of_stock += 1
+            if stock <= _decimal(product.get('minQuantity')):
+                low_stock += 1
+            if stock > 0:
+                cost_value += stock * _decimal(product.get('cost'))
+                retail_value += stock * _decimal(product.get('price'))
+        return {
+            'product_count': count,
+            'low_stock_count': low_stock,
+            'out_of_stock_count': out_of_stock,
+            'stock_value': str(cost_value.quantize(Decimal('0.01'))),
+            'stock_retail_value': str(retail_value.quantize(Decimal('0.01'))),
+        }
+
+def _sales_kpis(data):
+    total = _decimal(data.get('total_sales'))
+    transactions = int(data.get('transactions') or 0)
+    return {
+        'todays_sales': str(total),
+        'todays_transactions': transactions,
+        'average_sale': str((total / transactions).quantize(Decimal('0.01'))) if transactions else '0.00',
+    }
+
+def compute_snapshot(request):
+    """
+    All dashboard KPIs, fetched in parallel. Returns (snapshot, complete);
+    KPIs whose source failed are left out and listed in snapshot['errors'].
+    """
+    api_base = get_api_base()
+    results, _ = fetch_with_catalog_mirror(
+        request,
+        {
+            'sales_today': f"{api_base}sales/today/",
+            'stock_alerts': f"{api_base}stockalerts/",
+            'products': f"{api_base}products/",
+        },
+        {'products': _ProductKPIs()},
+    )
+
+    kpis = {}
+    errors = {}
+    for name, result in results.items():
+        if not result.ok:
+            errors[name] = f"HTTP {result.status_code}" if result.status_code else result.status
+        elif name == 'sales_today':
+            kpis.update(_sales_kpis(result.data))
+        elif name == 'stock_alerts':
+            kpis['open_alerts'] = len(result.data)
+        else:
+            kpis.update(result.data)
+
+    snapshot = {'kpis': kpis, 'errors': errors, 'generated_at': time.time()}
+    return snapshot, not errors
+
+def _cache_key(request):
+    return request.session.get('user_client_id')
+
+def get_snapshot(request):
+    """
+    The tenant's snapshot and the cache state it was served from. Only
+    complete snapshots are cached, so a failed KPI is retried next time.
+    """
+    key = _cache_key(request)
+    state, snapshot = dashboard_cache.lookup(key)
+    if state == SWRCache.STALE:
+        api_request = detached_request(request)
+
+        def _refresh():
+            try:
+                fresh, complete = compute_snapshot(api_request)
+                return fresh if complete else None
+            finally:
+                # Runs in a thread whose DB connection no request cycle closes
+                connection.close()
+
+        dashboard_cache.refresh_in_background(key, _refresh)
+    if state != SWRCache.MISS:
+        return snapshot, state
+
+    snapshot, complete = compute_snapshot(request)
+    if complete:
+        dashboard_cache.set(key, snapshot)
+    return snapshot, state
@@ -1,19 +1,57 @@
+import asyncio
 from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .api_client import Deadline
+
+def _has_api_session(request):
+    return bool(request.session.get('is_authenticated') and 
+                request.session.get('access_token') and 
+                request.session.get('user_client_id'))
+
 def api_login_required(view_func):
     """
     Custom decorator that checks if user is authenticated via API tokens
     """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _wrapped_async_view(request, *args, **kwargs):
+            # The session is loaded from the DB, which must not run on the event loop
+            if await sync_to_async(_has_api_session)(request):
+                return await view_func(request, *args, **kwargs)
+            return redirect('login')
+        return _wrapped_async_view
+
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
         # Check if user has valid API tokens in session
-        if (request.session.get('is_authenticated') and 
-            request.session.get('access_token') and 
-            request.session.get('user_client_id')):
+        if _has_api_session(request):
             return view_func(request, *args, **kwargs)
         else:
             # Redirect to login page if not authenticated
             return redirect('login')
-    return _wrapped_view 
\ No newline at end of file
+    return _wrapped_view
+
+def api_deadline(seconds):
+    """
+    Give the backend calls of a view `seconds` in total, instead of the
+    global API_CLIENT['REQUEST_DEADLINE']. The clock starts when the view is called.
+    Only meant for read views: writes are never capped.
+    """
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_async_view(request, *args, **kwargs):
+                request.api_deadline = Deadline(seconds)
+                return await view_func(request, *args, **kwargs)
+            return _wrapped_async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            request.api_deadline = Deadline(seconds)
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,120 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .api_client import get_api_base, get_api_client, get_backend_urls, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CACHE_KEY = 'api_health:status'
+PROBE_LOCK_KEY = 'api_health:probe-lock'
+
+# Same rule as the old per-render probe: the API answered, even if it refused us
+ONLINE_STATUS_CODES = (200, 204, 401, 403, 405)
+
+def get_monitor_config():
+    config = {
+        'INTERVAL'  : 15,
+        'TIMEOUT'   : 2,
+        'IN_PROCESS': True,
+    }
+    config.update(getattr(settings, 'API_HEALTH_MONITOR', {}))
+    return config
+
+def get_api_url():
+    return get_api_base()
+
+def _probe_node(url, timeout):
+    try:
+        response = get_api_client().probe('OPTIONS', url, timeout=timeout)
+    except requests.exceptions.RequestException:
+        return 'Offline'
+    return 'Online' if response.status_code in ONLINE_STATUS_CODES else 'Offline'
+
+def probe_api(urls=None, timeout=None):
+    """
+    Probe every backend node once; returns the health record stored in the
+    cache. The API is Online while at least one node is.
+    """
+    urls = urls or get_backend_urls()
+    timeout = timeout or get_monitor_config()['TIMEOUT']
+    started = time.monotonic()
+    nodes = {url: _probe_node(url, timeout) for url in urls}
+    return {
+        'status': 'Online' if 'Online' in nodes.values() else 'Offline',
+        'nodes': nodes,
+        'latency_ms': round((time.monotonic() - started) * 1000, 1),
+        'checked_at': time.time(),
+    }
+
+def run_probe(interval):
+    """
+    Probe and publish the result, unless another worker already did so
+    during this interval (only effective with a shared cache backend)
+    """
+    if not cache.add(PROBE_LOCK_KEY, os.getpid(), timeout=max(1, interval - 1)):
+        return None
+    health = probe_api()
+    cache.set(HEALTH_CACHE_KEY, health, timeout=interval * 3)
+    return health
+
+def get_api_status():
+    """
+    O(1) read of the API status for templates; never touches the network
+    """
+    if get_api_client().breaker.state == CircuitBreaker.OPEN:
+        return 'Offline'
+    health = cache.get(HEALTH_CACHE_KEY)
+    if health is None:
+        # No probe published yet (or it went stale): trust the breaker
+        return 'Online'
+    # Eject / restore nodes of this worker's pool from the (possibly shared) probe
+    get_api_client().pool.apply_health(health.get('nodes', {}), health['checked_at'])
+    return health['status']
+
+class APIHealthMonitor(threading.Thread):
+    """
+    Daemon thread that probes the backend API every `interval` seconds
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='api-health-monitor', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                run_probe(self.interval)
+            except Exception:
+                logger.exception('API health probe failed')
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+_monitor = None
+_monitor_pid = None
+_monitor_lock = threading.Lock()
+
+def ensure_health_monitor():
+    """
+    Start the in-process monitor of this worker, once
+    """
+    global _monitor, _monitor_pid
+    config = get_monitor_config()
+    if not config['IN_PROCESS']:
+        return
+    pid = os.getpid()
+    if _monitor is not None and _monitor_pid == pid:
+        return
+    with _monitor_lock:
+        if _monitor is None or _monitor_pid != pid:
+            _monitor = APIHealthMonitor(config['INTERVAL'])
+            _monitor_pid = pid
+            _monitor.start()
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.pages.health import get_monitor_config, run_probe
+
+class Command(BaseCommand):
+    help = 'Probe the backend API on an interval and publish its status to the shared cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=None, help='Seconds between probes')
+        parser.add_argument('--once', action='store_true', help='Probe once and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or get_monitor_config()['INTERVAL']
+        while True:
+            health = run_probe(interval)
+            if health:
+                self.stdout.write(f"API {health['status']} ({health['latency_ms']} ms)")
+            if options['once']:
+                break
+            time.sleep(interval)
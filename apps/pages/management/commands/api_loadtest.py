@@ -0,0 +1,150 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urljoin
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('inventory/', 'inventory/management/', 'dashboard-api/sales/today/')
+
+_CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def login(session, base_url, phone_number, password):
+    """
+    Log a load-test session in through the web tier's own login form
+    """
+    login_url = urljoin(base_url, 'accounts/login/')
+    page = session.get(login_url, timeout=30)
+    match = _CSRF_INPUT.search(page.text)
+    token = match.group(1) if match else session.cookies.get('csrftoken', '')
+    response = session.post(login_url, data={
+        'csrfmiddlewaretoken': token,
+        'phone_number': phone_number,
+        'password': password,
+    }, headers={'Referer': login_url}, allow_redirects=False, timeout=30)
+    if response.status_code != 302:
+        raise CommandError(f"Login failed with HTTP {response.status_code}; is the (fake) API running?")
+
+class LoadTest:
+    """
+    Closed-loop load: `concurrency` logged-in clients each request the
+    `paths` in turn, as fast as they are answered, for `duration` seconds
+    """
+
+    def __init__(self, base_url, paths, concurrency, duration, phone_number, password):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.paths = paths
+        self.concurrency = concurrency
+        self.duration = duration
+        self.phone_number = phone_number
+        self.password = password
+        self.latencies = defaultdict(list)   # path -> seconds
+        self.errors = defaultdict(int)       # path -> count
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def _client(self, session, index, start, stop):
+        start.wait()
+        i = index
+        while time.monotonic() < stop[0]:
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            started = time.monotonic()
+            try:
+                response = session.get(urljoin(self.base_url, path), allow_redirects=False, timeout=60)
+                failed = response.status_code >= 400 or response.status_code == 302
+            except requests.exceptions.RequestException:
+                failed = True
+            seconds = time.monotonic() - started
+            with self._lock:
+                self.latencies[path].append(seconds)
+                if failed:
+                    self.errors[path] += 1
+
+    def run(self):
+        # Logins are not part of the measurement
+        sessions = []
+        for _ in range(self.concurrency):
+            session = requests.Session()
+            login(session, self.base_url, self.phone_number, self.password)
+            sessions.append(session)
+
+        start = threading.Event()
+        stop = [float('inf')]
+        clients = [
+            threading.Thread(target=self._client, args=(session, i, start, stop), daemon=True)
+            for i, session in enumerate(sessions)
+        ]
+        for client in clients:
+            client.start()
+        began = time.monotonic()
+        stop[0] = began + self.duration
+        start.set()
+        for client in clients:
+            client.join()
+        self.elapsed = time.monotonic() - began
+        return self.report()
+
+    def report(self):
+        rows = []
+        everything = []
+        for path in self.paths:
+            values = sorted(self.latencies[path])
+            everything.extend(values)
+            rows.append(self._row(path, values, self.errors[path]))
+        rows.append(self._row('total', sorted(everything), sum(self.errors.values())))
+        return rows
+
+    def _row(self, name, values, errors):
+        return {
+            'path': name,
+            'requests': len(values),
+            'errors': errors,
+            'rps': round(len(values) / self.elapsed, 1) if self.elapsed else 0.0,
+            'p50_ms': round(percentile(values, 50) * 1000, 1),
+            'p95_ms': round(percentile(values, 95) * 1000, 1),
+            'p99_ms': round(percentile(values, 99) * 1000, 1),
+        }
+
+class Command(BaseCommand):
+    help = 'Load test the web tier views and report p50/p95/p99 latency and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:5005/', help='Base URL of the running web tier (gunicorn-cfg.py binds port 5005)')
+        parser.add_argument('--path', action='append', dest='paths', help=f'Page to request, repeatable (default: {", ".join(DEFAULT_PATHS)})')
+        parser.add_argument('--concurrency', type=int, default=10, help='Simultaneous clients')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--phone-number', default='0700000000')
+        parser.add_argument('--password', default='loadtest')
+
+    def handle(self, *args, **options):
+        test = LoadTest(
+            options['url'],
+            options['paths'] or list(DEFAULT_PATHS),
+            options['concurrency'],
+            options['duration'],
+            options['phone_number'],
+            options['password'],
+        )
+        self.stdout.write(f"Running {test.concurrency} clients for {test.duration:g}s against {test.base_url}")
+        rows = test.run()
+
+        header = f"{'path':<36}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for row in rows:
+            self.stdout.write(
+                f"{row['path']:<36}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            )
@@ -0,0 +1,350 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+def _b64(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+
+def make_token(user_client_id, token_type, ttl):
+    """
+    Unsigned JWT with the claims the web tier reads (`exp`)
+    """
+    header = {'alg': 'none', 'typ': 'JWT'}
+    payload = {
+        'token_type': token_type,
+        'user_client_id': user_client_id,
+        'exp': int(time.time() + ttl),
+        'jti': uuid.uuid4().hex,
+    }
+    return f"{_b64(header)}.{_b64(payload)}.fake"
+
+def read_token(token):
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except Exception:
+        return None
+
+class FakeDataset:
+    """
+    In-memory catalog of one tenant
+    """
+
+    def __init__(self, user_client_id, products, categories, units, seed):
+        rng = random.Random(f"{seed}:{user_client_id}")
+        self.lock = threading.Lock()
+        self.categories = {}
+        self.units = {}
+        self.products = {}
+        self.sales = {}
+        for i in range(categories):
+            self.add('categories', {
+                'category_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_client': user_client_id,
+                'name': f"Category {i + 1}",
+                'description': '',
+            })
+        for i in range(units):
+            self.add('units', {
+                'unit_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_client': user_client_id,
+                'unit_name': f"Unit {i + 1}",
+                'description': '',
+            })
+        category_ids = list(self.categories) or ['']
+        unit_ids = list(self.units) or ['']
+        for i in range(products):
+            category = rng.choice(category_ids)
+            cost = Decimal(rng.randint(50, 50000)) / 100
+            self.add('products', {
+                'product_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_client': user_client_id,
+                'category': category,
+                'category_name': self.categories.get(category, {}).get('name', ''),
+                'unit': rng.choice(unit_ids),
+                'name': f"Product {i + 1}",
+                'sku': f"SKU-{i + 1:06d}",
+                'barcode': f"{6000000000000 + i}",
+                'description': '',
+                'minQuantity': rng.randint(0, 20),
+                'price': str((cost * Decimal('1.3')).quantize(Decimal('0.01'))),
+                'cost': str(cost),
+                'stock': rng.randint(0, 500),
+            })
+
+    ID_FIELDS = {'products': 'product_id', 'categories': 'category_id', 'units': 'unit_id'}
+
+    def add(self, kind, item):
+        getattr(self, kind)[item[self.ID_FIELDS[kind]]] = item
+        return item
+
+    def stock_alerts(self):
+        now = datetime.now(timezone.utc).isoformat()
+        return [
+            {
+                'product_name': product['name'],
+                'alert_type': 'low_stock',
+                'message': f"{product['name']} is low on stock ({product['stock']} left)",
+                'created_at': now,
+            }
+            for product in self.products.values() if product['stock'] <= product['minQuantity']
+        ]
+
+    def record_sale(self, sale):
+        """
+        Book a sale once per sale_id; returns (sale, created)
+        """
+        sale_id = sale.get('sale_id') or str(uuid.uuid4())
+        if sale_id in self.sales:
+            return self.sales[sale_id], False
+        self.sales[sale_id] = dict(sale, sale_id=sale_id)
+        return self.sales[sale_id], True
+
+    def sales_today(self):
+        total = sum(Decimal(p['price']) for p in list(self.products.values())[:25])
+        total += sum(Decimal(sale.get('total') or 0) for sale in self.sales.values())
+        return {
+            'total_sales': str(total),
+            'transactions': 25 + len(self.sales),
+            'date': datetime.now(timezone.utc).date().isoformat(),
+        }
+
+class FakeBackend:
+    """
+    Stand-in for the backend API: the endpoints used by apps/pages, with
+    configurable latency, error rate and dataset size
+    """
+
+    COLLECTION = re.compile(r'^/api/(products|categories|units)/(?:([0-9a-fA-F-]{36})/)?$')
+
+    def __init__(self, products=1000, categories=20, units=5, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, token_ttl=300, seed=0):
+        self.sizes = (products, categories, units)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_ttl = token_ttl
+        self.seed = seed
+        self._datasets = {}
+        self._lock = threading.Lock()
+
+    def dataset(self, user_client_id):
+        with self._lock:
+            if user_client_id not in self._datasets:
+                self._datasets[user_client_id] = FakeDataset(user_client_id, *self.sizes, seed=self.seed)
+            return self._datasets[user_client_id]
+
+    def tenant_for(self, phone_number):
+        # Same phone number, same tenant, across restarts
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"asiria-fake:{phone_number}"))
+
+    def issue_tokens(self, user_client_id, phone_number=''):
+        return {
+            'access': make_token(user_client_id, 'access', self.token_ttl),
+            'refresh': make_token(user_client_id, 'refresh', self.token_ttl * 24),
+            'user_client_id': user_client_id,
+            'client_name': f"Load Test {phone_number}".strip(),
+            'storename': 'Fake Store',
+            'role': 'Client',
+        }
+
+    def delay(self):
+        seconds = self.latency + random.uniform(0, self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def build_handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            server_version = 'AsiriaFakeAPI/1.0'
+
+            def log_message(self, format, *args):
+                pass
+
+            # ----------------- Responses -----------------
+
+            def send_json(self, status, data, etag=False):
+                body = json.dumps(data).encode()
+                tag = f'"{hashlib.md5(body).hexdigest()}"' if etag else None
+                if tag and self.headers.get('If-None-Match') == tag:
+                    self.send_response(304)
+                    self.send_header('ETag', tag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if tag:
+                    self.send_header('ETag', tag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_empty(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length))
+                except ValueError:
+                    return {}
+
+            def tenant(self):
+                """
+                user_client_id of a valid access token, or None (401 sent)
+                """
+                auth = self.headers.get('Authorization', '')
+                claims = read_token(auth[7:]) if auth.startswith('Bearer ') else None
+                if not claims or claims.get('token_type') != 'access' or claims.get('exp', 0) < time.time():
+                    self.send_json(401, {'detail': 'Given token not valid for any token type'})
+                    return None
+                return claims['user_client_id']
+
+            # ----------------- Dispatch -----------------
+
+            def handle_any(self, method):
+                path = urlsplit(self.path).path
+                body = self.read_json() if method in ('POST', 'PUT') else None
+                backend.delay()
+                if method == 'OPTIONS':
+                    return self.send_json(200, {'name': 'Asiria fake API'})
+                if backend.fail():
+                    return self.send_json(backend.error_status, {'detail': 'Injected failure'})
+
+                if path == '/api/token/' and method == 'POST':
+                    if not body.get('password'):
+                        return self.send_json(401, {'detail': 'No active account found with the given credentials'})
+                    phone = body.get('phone_number') or body.get('username') or body.get('email') or ''
+                    return self.send_json(200, backend.issue_tokens(backend.tenant_for(phone), phone))
+                if path == '/api/token/refresh/' and method == 'POST':
+                    claims = read_token(body.get('refresh', ''))
+                    if not claims or claims.get('token_type') != 'refresh' or claims.get('exp', 0) < time.time():
+                        return self.send_json(401, {'detail': 'Token is invalid or expired'})
+                    tokens = backend.issue_tokens(claims['user_client_id'])
+                    return self.send_json(200, {'access': tokens['access'], 'refresh': tokens['refresh']})
+                if path == '/api/clients/' and method == 'POST':
+                    return self.send_json(201, {'user_client_id': backend.tenant_for(body.get('phone_number', '')), **body})
+
+                tenant = self.tenant()
+                if tenant is None:
+                    return
+                dataset = backend.dataset(tenant)
+
+                if path == '/api/stockalerts/' and method == 'GET':
+                    return self.send_json(200, dataset.stock_alerts(), etag=True)
+                if path == '/api/sales/today/' and method == 'GET':
+                    return self.send_json(200, dataset.sales_today())
+                if path == '/api/sales/' and method == 'POST':
+                    with dataset.lock:
+                        sale, created = dataset.record_sale(body)
+                    return self.send_json(201 if created else 409, sale)
+
+                match = FakeBackend.COLLECTION.match(path)
+                if not match:
+                    return self.send_json(404, {'detail': 'Not found.'})
+                kind, item_id = match.groups()
+                with dataset.lock:
+                    items = getattr(dataset, kind)
+                    if item_id is None:
+                        if method == 'GET':
+                            return self.send_json(200, list(items.values()), etag=True)
+                        if method == 'POST':
+                            item = dict(body, **{FakeDataset.ID_FIELDS[kind]: str(uuid.uuid4())})
+                            return self.send_json(201, dataset.add(kind, item))
+                    elif item_id in items:
+                        if method == 'GET':
+                            return self.send_json(200, items[item_id], etag=True)
+                        if method in ('PUT', 'PATCH'):
+                            items[item_id].update(body)
+                            return self.send_json(200, items[item_id])
+                        if method == 'DELETE':
+                            del items[item_id]
+                            return self.send_empty(204)
+                    else:
+                        return self.send_json(404, {'detail': 'Not found.'})
+                return self.send_json(405, {'detail': f'Method "{method}" not allowed.'})
+
+            def do_GET(self):
+                self.handle_any('GET')
+
+            def do_POST(self):
+                self.handle_any('POST')
+
+            def do_PUT(self):
+                self.handle_any('PUT')
+
+            def do_PATCH(self):
+                self.handle_any('PATCH')
+
+            def do_DELETE(self):
+                self.handle_any('DELETE')
+
+            def do_OPTIONS(self):
+                self.handle_any('OPTIONS')
+
+        return Handler
+
+class Command(BaseCommand):
+    help = 'Run a stand-in backend API (token, products, categories, units, stock alerts, sales) for local benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8080)
+        parser.add_argument('--products', type=int, default=1000, help='Products per tenant')
+        parser.add_argument('--categories', type=int, default=20, help='Categories per tenant')
+        parser.add_argument('--units', type=int, default=5, help='Units per tenant')
+        parser.add_argument('--latency', type=float, default=0.0, help='Added latency per call, in ms')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency up to this many ms')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with --error-status (0-1)')
+        parser.add_argument('--error-status', type=int, default=503)
+        parser.add_argument('--token-ttl', type=int, default=300, help='Access token lifetime, in seconds')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated datasets')
+
+    def handle(self, *args, **options):
+        backend = FakeBackend(
+            products=options['products'],
+            categories=options['categories'],
+            units=options['units'],
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'],
+            error_status=options['error_status'],
+            token_ttl=options['token_ttl'],
+            seed=options['seed'],
+        )
+        server = ThreadingHTTPServer((options['host'], options['port']), backend.build_handler())
+        server.daemon_threads = True
+        self.stdout.write(
+            f"Fake API on http://{options['host']}:{server.server_port}/api/ "
+            f"({options['products']} products/tenant, {options['latency']:g}+{options['jitter']:g} ms, "
+            f"{options['error_rate']:.0%} errors)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
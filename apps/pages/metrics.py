@@ -0,0 +1,172 @@
+"""
+In-process metrics of the outbound backend API calls, exposed in the
+Prometheus text format by the /metrics view.
+
+Values are kept per worker process, like the API client itself.
+"""
+
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_UUID = re.compile(r'^[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}$')
+
+def normalize_endpoint(url):
+    """
+    Label for a backend URL: its path, with UUID and numeric segments
+    collapsed so that products/<uuid>/ is a single series
+    """
+    segments = urlsplit(url).path.split('/')
+    return '/'.join(
+        ':id' if (_UUID.match(segment) or segment.isdigit()) else segment
+        for segment in segments
+    ) or '/'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(zip(self.labelnames, key))} {value}'
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values = {}   # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            values = {key: list(series) for key, series in self._values.items()}
+        for key, series in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                yield f'{self.name}_bucket{_format_labels(labels + [("le", bound)])} {count}'
+            yield f'{self.name}_bucket{_format_labels(labels + [("le", "+Inf")])} {series[-1]}'
+            yield f'{self.name}_sum{_format_labels(labels)} {round(series[-2], 6)}'
+            yield f'{self.name}_count{_format_labels(labels)} {series[-1]}'
+
+class CallbackMetric:
+    """
+    Metric whose values are read at scrape time from `callback`, which
+    returns {label values tuple: value}. Used to export state that other
+    components (circuit breaker, caches) already keep.
+    """
+
+    def __init__(self, name, documentation, metric_type, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.metric_type}'
+        for key, value in sorted(self.callback().items()):
+            yield f'{self.name}{_format_labels(zip(self.labelnames, key))} {value}'
+
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+api_request_duration = register(Histogram(
+    'asiria_api_request_duration_seconds',
+    'Latency of outbound backend API calls.',
+    ('method', 'endpoint'),
+))
+api_requests = register(Counter(
+    'asiria_api_requests_total',
+    'Outbound backend API calls by response status ("error" when no response).',
+    ('method', 'endpoint', 'status'),
+))
+api_retries = register(Counter(
+    'asiria_api_retries_total',
+    'Backend API calls sent again, by reason.',
+    ('endpoint', 'reason'),
+))
+api_coalesced = register(Counter(
+    'asiria_api_coalesced_total',
+    'Tenant GETs answered by sharing an identical in-flight call.',
+    ('endpoint',),
+))
+api_token_refreshes = register(Counter(
+    'asiria_api_token_refreshes_total',
+    'Calls to the token refresh endpoint, by outcome.',
+    ('outcome',),
+))
+sale_queue_submissions = register(Counter(
+    'asiria_sale_queue_submissions_total',
+    'Queued POS sales submitted to the backend, by outcome.',
+    ('outcome',),
+))
+
+def observe_api_call(method, url, seconds, status):
+    endpoint = normalize_endpoint(url)
+    api_request_duration.observe(seconds, method=method.upper(), endpoint=endpoint)
+    api_requests.inc(method=method.upper(), endpoint=endpoint, status=str(status))
+
+def record_short_circuit(method, url):
+    # Rejected by the open circuit breaker: no latency to observe
+    api_requests.inc(method=method.upper(), endpoint=normalize_endpoint(url), status='circuit_open')
+
+def record_coalesced(url):
+    api_coalesced.inc(endpoint=normalize_endpoint(url))
+
+def record_retry(url, reason):
+    api_retries.inc(endpoint=normalize_endpoint(url), reason=reason)
+
+def render_metrics():
+    """
+    All registered metrics in the Prometheus text exposition format
+    """
+    lines = [f'# Worker pid {os.getpid()}']
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
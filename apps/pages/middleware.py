@@ -0,0 +1,44 @@
+import asyncio
+
+from django.utils.decorators import sync_and_async_middleware
+
+from .api_client import Deadline, get_client_config
+from .utils import RequestMemo
+
+def open_request_scope(request):
+    """
+    Attach the per-request state used by make_authenticated_request
+    """
+    request.api_memo = RequestMemo()
+    # Views may set their own budget with decorators.api_deadline. Writes get
+    # none: a cut-short POST/PUT/DELETE may still have been applied
+    seconds = get_client_config()['REQUEST_DEADLINE'] if request.method in ('GET', 'HEAD') else 0
+    request.api_deadline = Deadline(seconds) if seconds else None
+
+def close_request_scope(request):
+    # Drop the memoized responses with the request, even if a thread kept a reference
+    memo = getattr(request, 'api_memo', None)
+    if memo is not None:
+        memo.clear()
+        del request.api_memo
+
+@sync_and_async_middleware
+def api_request_scope_middleware(get_response):
+    """
+    Scope backend API state (the GET memo, the deadline) to one Django request
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            open_request_scope(request)
+            try:
+                return await get_response(request)
+            finally:
+                close_request_scope(request)
+    else:
+        def middleware(request):
+            open_request_scope(request)
+            try:
+                return get_response(request)
+            finally:
+                close_request_scope(request)
+    return middleware
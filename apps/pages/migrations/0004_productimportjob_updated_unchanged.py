@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("pages", "0003_alter_productimportjob_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimportjob",
+            name="updated",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="productimportjob",
+            name="unchanged",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
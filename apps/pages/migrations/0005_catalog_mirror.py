@@ -0,0 +1,37 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0004_productimportjob_updated_unchanged'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogMirrorState',
+            fields=[
+                ('user_client', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('stale', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MirroredProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_client', models.CharField(max_length=64)),
+                ('product_id', models.CharField(max_length=64)),
+                ('data', models.JSONField()),
+                ('content_hash', models.CharField(max_length=40)),
+                ('synced_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='mirroredproduct',
+            constraint=models.UniqueConstraint(fields=('user_client', 'product_id'), name='unique_mirrored_product'),
+        ),
+    ]
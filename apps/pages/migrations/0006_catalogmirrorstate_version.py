@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0005_catalog_mirror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogmirrorstate',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
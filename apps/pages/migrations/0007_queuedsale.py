@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:36
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0006_catalogmirrorstate_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedSale',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sale_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('user_client', models.CharField(max_length=64)),
+                ('terminal', models.CharField(max_length=64)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'user_client', 'terminal', 'id'], name='queued_sale_lane')],
+            },
+        ),
+    ]
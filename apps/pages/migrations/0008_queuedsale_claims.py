@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:47
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0007_queuedsale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedsale',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='queuedsale',
+            name='sale_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='queuedsale',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=16),
+        ),
+        migrations.AddConstraint(
+            model_name='queuedsale',
+            constraint=models.UniqueConstraint(fields=('user_client', 'sale_id'), name='unique_queued_sale'),
+        ),
+    ]
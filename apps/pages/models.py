@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -10,3 +13,115 @@ class Product(models.Model):
 
     def __str__(self):
         return self.name
+
+class ProductImportJob(models.Model):
+    """
+    A CSV product import running outside the request cycle
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_VALIDATING = 'validating'
+    STATUS_INVALID = 'invalid'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE    = 'done'
+    STATUS_FAILED  = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_VALIDATING, 'Validating'),
+        (STATUS_INVALID, 'Invalid'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_client = models.CharField(max_length=64, db_index=True)
+    filename    = models.CharField(max_length=255, default='')
+    status      = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    processed   = models.PositiveIntegerField(default=0)
+    created     = models.PositiveIntegerField(default=0)
+    updated     = models.PositiveIntegerField(default=0)
+    unchanged   = models.PositiveIntegerField(default=0)
+    failed      = models.PositiveIntegerField(default=0)
+    message     = models.TextField(blank=True, default='')
+    created_at  = models.DateTimeField(auto_now_add=True)
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED, self.STATUS_INVALID)
+
+class MirroredProduct(models.Model):
+    """
+    Local copy of one product of a tenant's backend catalog (see catalog_mirror)
+    """
+    user_client  = models.CharField(max_length=64)
+    product_id   = models.CharField(max_length=64)
+    data         = models.JSONField()
+    content_hash = models.CharField(max_length=40)
+    synced_at    = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_client', 'product_id'], name='unique_mirrored_product'),
+        ]
+
+    def __str__(self):
+        return self.data.get('name', self.product_id)
+
+class CatalogMirrorState(models.Model):
+    """
+    When the catalog mirror of a tenant was last synced with the backend
+    """
+    user_client   = models.CharField(max_length=64, primary_key=True)
+    synced_at     = models.DateTimeField(null=True, blank=True)
+    product_count = models.PositiveIntegerField(default=0)
+    stale         = models.BooleanField(default=False)
+    # Bumped on every change of the mirrored rows, so in-memory copies know to rebuild
+    version       = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_client} ({self.synced_at})"
+
+class QueuedSale(models.Model):
+    """
+    A POS sale accepted at the till and waiting to be submitted to the
+    backend (see sale_queue). Rows are sent in id order per terminal.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT    = 'sent'
+    STATUS_FAILED  = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Also sent to the backend, so a sale retried after a lost response is not booked twice
+    sale_id         = models.UUIDField(default=uuid.uuid4, editable=False)
+    user_client     = models.CharField(max_length=64)
+    terminal        = models.CharField(max_length=64)
+    payload         = models.JSONField()
+    status          = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts        = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # While `sending`: until when the worker process that claimed the sale owns it
+    lease_until     = models.DateTimeField(null=True, blank=True)
+    last_error      = models.TextField(blank=True, default='')
+    created_at      = models.DateTimeField(auto_now_add=True)
+    sent_at         = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_client', 'sale_id'], name='unique_queued_sale'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'user_client', 'terminal', 'id'], name='queued_sale_lane'),
+        ]
+
+    def __str__(self):
+        return f"{self.sale_id} ({self.status})"
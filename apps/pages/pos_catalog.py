@@ -0,0 +1,134 @@
+"""
+In-memory POS catalog: what a till needs to ring up a scanned item, per
+tenant, resolved by barcode or SKU with a single dict lookup.
+
+Built from the local catalog mirror (see catalog_mirror) and rebuilt as a
+whole, off to the side, whenever the mirror's version changes; readers
+always see either the old or the new catalog, never a half-built one.
+"""
+
+import sys
+import threading
+import time
+
+from .catalog_mirror import get_catalog_version, get_mirrored_products
+
+class PosProduct:
+    """
+    One sellable product; slotted to keep 10k+ of them small
+    """
+    __slots__ = ('product_id', 'name', 'sku', 'barcode', 'price', 'stock', 'unit', 'category', 'category_name')
+
+    FIELDS = __slots__
+
+    def __init__(self, data):
+        self.product_id = str(data.get('product_id') or '')
+        self.name = data.get('name') or ''
+        self.sku = (data.get('sku') or '').strip()
+        self.barcode = (data.get('barcode') or '').strip()
+        self.price = str(data.get('price') or '0.00')
+        self.stock = int(data.get('stock') or 0)
+        self.unit = data.get('unit') or ''
+        self.category = data.get('category') or ''
+        self.category_name = data.get('category_name') or ''
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+class PosCatalog:
+    """
+    Immutable once built: products plus id, barcode and SKU hash indexes
+    """
+
+    def __init__(self, products, version):
+        self.version = version
+        self.built_at = time.time()
+        self.products = tuple(PosProduct(data) for data in products)
+        # Category / unit ids and names repeat across products: keep one copy
+        shared = {}
+        for product in self.products:
+            product.unit = shared.setdefault(product.unit, product.unit)
+            product.category = shared.setdefault(product.category, product.category)
+            product.category_name = shared.setdefault(product.category_name, product.category_name)
+        self.by_id = {}
+        self.by_barcode = {}
+        self.by_sku = {}
+        for product in self.products:
+            self.by_id[product.product_id] = product
+            if product.barcode:
+                self.by_barcode.setdefault(product.barcode, product)
+            if product.sku:
+                self.by_sku.setdefault(product.sku, product)
+
+    def lookup(self, code):
+        """
+        Product scanned or typed as `code`: barcode first, then SKU
+        """
+        code = (code or '').strip()
+        return self.by_barcode.get(code) or self.by_sku.get(code)
+
+    def memory_bytes(self):
+        """
+        Approximate bytes held: records, their field values and the indexes.
+        Strings shared with other structures are counted once.
+        """
+        seen = set()
+
+        def size(obj):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return sys.getsizeof(obj)
+
+        total = size(self.products) + size(self.by_id) + size(self.by_barcode) + size(self.by_sku)
+        for product in self.products:
+            total += size(product)
+            for field in PosProduct.FIELDS:
+                total += size(getattr(product, field))
+        return total
+
+    def get_stats(self):
+        count = len(self.products)
+        memory = self.memory_bytes()
+        return {
+            'version': self.version,
+            'built_at': self.built_at,
+            'products': count,
+            'barcodes': len(self.by_barcode),
+            'skus': len(self.by_sku),
+            'memory_bytes': memory,
+            'bytes_per_10k_products': round(memory / count * 10000) if count else 0,
+        }
+
+_catalogs = {}
+_build_locks = {}
+_lock = threading.Lock()
+
+def _build_lock(user_client):
+    with _lock:
+        return _build_locks.setdefault(user_client, threading.Lock())
+
+def get_pos_catalog(request, products_url):
+    """
+    The tenant's POS catalog, (re)built when the mirror changed. Returns
+    None if the mirror cannot be populated (backend offline on first use).
+    """
+    user_client = request.session.get('user_client_id')
+    version, _ = get_catalog_version(user_client)
+    catalog = _catalogs.get(user_client)
+    if catalog is not None and version is not None and catalog.version == version:
+        return catalog
+
+    with _build_lock(user_client):
+        catalog = _catalogs.get(user_client)
+        version, _ = get_catalog_version(user_client)
+        if catalog is not None and version is not None and catalog.version == version:
+            return catalog
+        # `version` was read before the rows: a change in between only
+        # causes one more rebuild, never a catalog labelled newer than its data
+        products, _ = get_mirrored_products(request, products_url)
+        if products is None:
+            return catalog
+        # Built aside and swapped in with one assignment
+        _catalogs[user_client] = catalog = PosCatalog(products, version)
+    return catalog
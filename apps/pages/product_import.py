@@ -0,0 +1,298 @@
+import csv
+import logging
+import os
+import threading
+from decimal import Decimal, InvalidOperation
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.conf import settings
+from django.db import connection
+
+from .bulk import RetryBudget, get_bulk_config, send_with_retry
+from .catalog_mirror import mark_stale
+from .models import ProductImportJob
+from .product_validation import iter_csv_rows, validate_product_csv
+from .reference_data import fetch_with_reference_cache
+from .utils import build_product_payload, detached_request, fetch_many
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('name', 'category', 'unit')
+
+def get_import_config():
+    config = {
+        'UPLOAD_DIR'     : os.path.join(settings.BASE_DIR, 'media', 'imports'),
+        'CONCURRENCY'    : 8,
+        'PROGRESS_EVERY' : 50,   # rows between progress writes to the DB
+    }
+    config.update(getattr(settings, 'PRODUCT_IMPORT', {}))
+    return config
+
+def upload_path(job_id):
+    return os.path.join(get_import_config()['UPLOAD_DIR'], f"{job_id}.csv")
+
+def error_report_path(job_id):
+    return os.path.join(get_import_config()['UPLOAD_DIR'], f"{job_id}-errors.csv")
+
+def save_upload(job, uploaded_file):
+    """
+    Copy the upload to disk chunk by chunk, never holding it in memory
+    """
+    os.makedirs(get_import_config()['UPLOAD_DIR'], exist_ok=True)
+    with open(upload_path(job.id), 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+
+class ErrorReport:
+    """
+    CSV of the rows that could not be imported, with the reason
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._handle = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def add(self, line, row, reason):
+        with self._lock:
+            if self._writer is None:
+                self._handle = open(self.path, 'w', newline='', encoding='utf-8')
+                fields = ['line', 'error'] + [f for f in row.keys() if f is not None]
+                self._writer = csv.DictWriter(self._handle, fieldnames=fields, extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerow({**row, 'line': line, 'error': reason})
+            self.count += 1
+
+    def close(self):
+        if self._handle:
+            self._handle.close()
+
+# Outcomes of one imported row
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+COMPARED_FIELDS = ('category', 'unit', 'name', 'sku', 'barcode', 'description', 'minQuantity', 'price', 'cost', 'stock')
+
+def _normalize(field, value):
+    if value is None:
+        return ''
+    if field in ('price', 'cost'):
+        try:
+            return Decimal(str(value))
+        except InvalidOperation:
+            return str(value)
+    if field in ('minQuantity', 'stock'):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return str(value)
+    return str(value).strip()
+
+class ProductIndex:
+    """
+    Hash index of a tenant's existing products by SKU and by barcode, so a
+    re-imported row is matched in O(1) and turned into an update or a no-op
+    """
+
+    def __init__(self):
+        self.by_sku = {}
+        self.by_barcode = {}
+
+    @classmethod
+    def from_items(cls, items):
+        index = cls()
+        for product in items:
+            index.add(product)
+        return index
+
+    def add(self, product):
+        # Only the fields needed to compare are kept, not the whole record
+        record = {field: _normalize(field, product.get(field)) for field in COMPARED_FIELDS}
+        record['product_id'] = product.get('product_id')
+        if record['sku']:
+            self.by_sku[record['sku']] = record
+        if record['barcode']:
+            self.by_barcode[record['barcode']] = record
+
+    def match(self, data):
+        sku = (data.get('sku') or '').strip()
+        barcode = (data.get('barcode') or '').strip()
+        return (sku and self.by_sku.get(sku)) or (barcode and self.by_barcode.get(barcode)) or None
+
+    @staticmethod
+    def changed(existing, data):
+        return any(existing[field] != _normalize(field, data.get(field)) for field in COMPARED_FIELDS)
+
+def _load_index(api_request, products_url):
+    # Streamed: the index is built item by item, without the full product list
+    result = fetch_many(api_request, {'products': products_url}, {'products': ProductIndex.from_items})['products']
+    if not result.ok:
+        raise RuntimeError(f"could not load existing products ({result.status_code or result.status})")
+    return result.data
+
+def _preflight(job, api_request, reference_calls):
+    """
+    Validate the whole file before any write reaches the API. Returns True
+    when the import may go on; otherwise the job is closed as invalid with
+    the validation report as its error report.
+    """
+    job.status = ProductImportJob.STATUS_VALIDATING
+    job.save(update_fields=['status', 'updated_at'])
+
+    # Unknown category/unit IDs can only be checked if the reference data loads
+    results = fetch_with_reference_cache(api_request, reference_calls)
+    categories = results['categories'].data if results['categories'].ok else None
+    units = results['units'].data if results['units'].ok else None
+
+    report = validate_product_csv(upload_path(job.id), categories, units)
+    if report.valid:
+        return True
+
+    with open(error_report_path(job.id), 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.DictWriter(handle, fieldnames=['line', 'column', 'error'])
+        writer.writeheader()
+        writer.writerows(report.as_rows())
+    job.status = ProductImportJob.STATUS_INVALID
+    job.processed = report.total_rows
+    job.failed = len(report.invalid_lines)
+    job.message = f"Validation failed, nothing was imported: {report.summary()}."
+    return False
+
+def _import_row(api_request, products_url, index, user_client, row, config, budget):
+    """
+    Create, update or skip one row. Returns (outcome, None) or (None, failure reason).
+    """
+    missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    try:
+        data = build_product_payload(row, user_client)
+    except ValueError as e:
+        return None, f"invalid number: {e}"
+
+    existing = index.match(data)
+    if existing is None:
+        method, url, outcome = "POST", products_url, CREATED
+    elif not ProductIndex.changed(existing, data):
+        return UNCHANGED, None
+    else:
+        method, url, outcome = "PUT", f"{products_url}{existing['product_id']}/", UPDATED
+
+    resp, reason = send_with_retry(api_request, method, url, data=data, config=config, budget=budget)
+    if resp is None:
+        return None, reason
+    if resp.status_code in (200, 201):
+        return outcome, None
+    return None, f"HTTP {resp.status_code}: {resp.text[:200]}"
+
+def run_import(job_id, api_request, products_url, reference_calls):
+    """
+    Import the saved CSV of `job_id`: after a pre-flight validation of the
+    whole file, rows are read lazily and POSTed with bounded concurrency;
+    at most 2x CONCURRENCY rows are in memory at once
+    """
+    config = get_import_config()
+    retry_config = dict(get_bulk_config(), CONCURRENCY=config['CONCURRENCY'])
+    job = ProductImportJob.objects.get(pk=job_id)
+
+    try:
+        if not _preflight(job, api_request, reference_calls):
+            job.save()
+            return
+    except Exception as e:
+        logger.exception('Product import %s failed validation', job.id)
+        job.status = ProductImportJob.STATUS_FAILED
+        job.message = f"Validation stopped: {e}"
+        job.save()
+        return
+    finally:
+        if job.finished:
+            _cleanup(job)
+
+    job.status = ProductImportJob.STATUS_RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    report = ErrorReport(error_report_path(job.id))
+    # The file size is unknown up front: retries are earned as rows complete
+    budget = RetryBudget(config['CONCURRENCY'])
+    processed = 0
+    outcomes = {CREATED: 0, UPDATED: 0, UNCHANGED: 0}
+
+    def _save_progress():
+        ProductImportJob.objects.filter(pk=job.id).update(
+            processed=processed, failed=report.count, **outcomes,
+        )
+
+    try:
+        index = _load_index(api_request, products_url)
+        with ThreadPoolExecutor(max_workers=config['CONCURRENCY'], thread_name_prefix='csv-import') as pool:
+            in_flight = {}
+
+            def _collect(done):
+                nonlocal processed
+                for future in done:
+                    line, row = in_flight.pop(future)
+                    outcome, reason = future.result()
+                    processed += 1
+                    budget.deposit(retry_config['RETRY_BUDGET'])
+                    if outcome is not None:
+                        outcomes[outcome] += 1
+                    else:
+                        report.add(line, row, reason)
+                    if processed % config['PROGRESS_EVERY'] == 0:
+                        _save_progress()
+
+            for line, row in iter_csv_rows(upload_path(job.id)):
+                if len(in_flight) >= config['CONCURRENCY'] * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(done)
+                future = pool.submit(
+                    _import_row, api_request, products_url, index, job.user_client, row, retry_config, budget
+                )
+                in_flight[future] = (line, row)
+            _collect(wait(in_flight).done)
+
+        job.status = ProductImportJob.STATUS_DONE
+        job.message = (f"Imported {processed - report.count} products from CSV: {outcomes[CREATED]} created, "
+                       f"{outcomes[UPDATED]} updated, {outcomes[UNCHANGED]} unchanged.")
+    except Exception as e:
+        logger.exception('Product import %s failed', job.id)
+        job.status = ProductImportJob.STATUS_FAILED
+        job.message = f"Import stopped: {e}"
+    finally:
+        report.close()
+        job.processed, job.failed = processed, report.count
+        job.created, job.updated, job.unchanged = outcomes[CREATED], outcomes[UPDATED], outcomes[UNCHANGED]
+        job.save()
+        # Rows were written behind the mirror's back: re-sync on next read
+        mark_stale(job.user_client)
+        _cleanup(job)
+
+def _cleanup(job):
+    try:
+        os.remove(upload_path(job.id))
+    except OSError:
+        pass
+    # This thread's DB connection is not managed by the request cycle
+    connection.close()
+
+def start_import(request, uploaded_file, products_url, reference_calls):
+    """
+    Create the job, store the upload and run the import in a background thread
+    """
+    job = ProductImportJob.objects.create(
+        user_client=request.session.get("user_client_id"),
+        filename=os.path.basename(uploaded_file.name)[:255],
+    )
+    save_upload(job, uploaded_file)
+
+    threading.Thread(
+        target=run_import,
+        args=(job.id, detached_request(request), products_url, reference_calls),
+        name=f"csv-import-{job.id}",
+        daemon=True,
+    ).start()
+    return job
@@ -0,0 +1,274 @@
+"""
+Per-tenant product search behind the POS and inventory typeahead.
+
+Product names, SKUs and barcodes are split into lowercase terms kept in a
+prefix trie; names are also indexed by trigram, for typo-tolerant matches
+when too few products match by prefix. Like the POS catalog the index is
+built from the local catalog mirror; products created, edited or deleted
+through this worker are applied to it in place instead of rebuilding it.
+"""
+
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+
+from .catalog_mirror import get_catalog_version, get_mirrored_products
+from .pos_catalog import PosProduct
+
+_TERM = re.compile(r'\w+')
+
+PREFIX_CANDIDATES = 1000  # products ranked per query, shortest terms first
+FUZZY_CANDIDATES = 2000   # products scored per fuzzy query, most shared trigrams first
+MIN_SIMILARITY = 0.5      # share of the query's trigrams a fuzzy match must have
+
+def terms(text):
+    return _TERM.findall((text or '').lower())
+
+def trigrams(text):
+    padded = f"  {' '.join(terms(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = set()
+
+class PrefixTrie:
+    """
+    Terms to the ids of the products containing them
+    """
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, term, product_id):
+        node = self.root
+        for char in term:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        node.ids.add(product_id)
+
+    def remove(self, term, product_id):
+        path = [self.root]
+        for char in term:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].ids.discard(product_id)
+        # Prune the branch back up to the last node still in use
+        for depth in range(len(term), 0, -1):
+            if path[depth].ids or path[depth].children:
+                break
+            del path[depth - 1].children[term[depth - 1]]
+
+    def search(self, prefix, limit):
+        """
+        Ids of products with a term starting with `prefix`, shortest
+        terms first, stopping once at least `limit` ids are found
+        """
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        found = set()
+        level = [node]
+        while level:
+            below = []
+            for node in level:
+                found |= node.ids
+                if len(found) >= limit:
+                    return found
+                below.extend(node.children.values())
+            level = below
+        return found
+
+class SearchIndex:
+    """
+    Prefix trie plus trigram postings over one tenant's products
+    """
+
+    def __init__(self, products, version):
+        self.version = version
+        self.built_at = time.time()
+        self.products = {}
+        self.trie = PrefixTrie()
+        self.trigrams = {}     # trigram -> ids of the products whose name has it
+        self._indexed = {}     # product_id -> (terms, trigrams, name, sku) as indexed
+        self._lock = threading.Lock()
+        for data in products:
+            self._add(PosProduct(data))
+
+    # ----------------- Writes -----------------
+
+    def _add(self, product):
+        if not product.product_id:
+            return
+        product_terms = set(terms(product.name)) | set(terms(product.sku)) | set(terms(product.barcode))
+        name_trigrams = trigrams(product.name)
+        for term in product_terms:
+            self.trie.add(term, product.product_id)
+        for gram in name_trigrams:
+            self.trigrams.setdefault(gram, set()).add(product.product_id)
+        self.products[product.product_id] = product
+        self._indexed[product.product_id] = (
+            tuple(product_terms), frozenset(name_trigrams),
+            ' '.join(terms(product.name)), ' '.join(terms(product.sku)),
+        )
+
+    def _remove(self, product_id):
+        indexed = self._indexed.pop(product_id, None)
+        if indexed is None:
+            return
+        del self.products[product_id]
+        for term in indexed[0]:
+            self.trie.remove(term, product_id)
+        for gram in indexed[1]:
+            posting = self.trigrams.get(gram)
+            if posting is not None:
+                posting.discard(product_id)
+                if not posting:
+                    del self.trigrams[gram]
+
+    def apply(self, upserts=(), deletes=(), version=None):
+        """
+        Apply product writes in place. The index takes on `version` only if
+        these writes are the sole change since its own version; otherwise it
+        stays behind and is rebuilt on its next read.
+        """
+        with self._lock:
+            for product_id in deletes:
+                self._remove(str(product_id))
+            for data in upserts:
+                product = PosProduct(data)
+                self._remove(product.product_id)
+                self._add(product)
+            if version is not None and self.version is not None and version == self.version + 1:
+                self.version = version
+
+    # ----------------- Reads -----------------
+
+    def search(self, query, limit=10):
+        """
+        Up to `limit` products for `query`, best first: exact SKU / barcode,
+        then names starting with the query, then any term starting with each
+        query word, then fuzzy (trigram) name matches
+        """
+        query_terms = terms(query)
+        if not query_terms or limit <= 0:
+            return []
+        phrase = ' '.join(query_terms)
+        with self._lock:
+            ranked = {}
+            for product_id in self._prefix_matches(query_terms):
+                ranked[product_id] = self._prefix_rank(product_id, phrase)
+            if len(ranked) < limit and any(char.isalpha() for char in phrase):
+                for product_id, similarity in self._fuzzy(query, limit):
+                    if product_id not in ranked:
+                        ranked[product_id] = (3, -similarity)
+            best = heapq.nsmallest(
+                limit, ranked,
+                key=lambda product_id: ranked[product_id] + (len(self.products[product_id].name), self.products[product_id].name),
+            )
+            return [self.products[product_id] for product_id in best]
+
+    def _prefix_matches(self, query_terms):
+        """
+        Products with a term starting with each query word; for a single
+        word only the first PREFIX_CANDIDATES found, shortest terms first
+        """
+        if len(query_terms) == 1:
+            return self.trie.search(query_terms[0], PREFIX_CANDIDATES)
+        # Every word must match: intersect from the rarest (usually longest) word
+        matches = None
+        for word in sorted(set(query_terms), key=len, reverse=True):
+            found = self.trie.search(word, len(self.products))
+            matches = found if matches is None else matches & found
+            if not matches:
+                return set()
+        return set(list(matches)[:PREFIX_CANDIDATES])
+
+    def _prefix_rank(self, product_id, phrase):
+        _, _, name, sku = self._indexed[product_id]
+        if phrase == sku or phrase == self.products[product_id].barcode.lower():
+            return (0, 0.0)
+        if name.startswith(phrase):
+            return (1, 0.0)
+        return (2, 0.0)
+
+    def _fuzzy(self, query, limit):
+        grams = trigrams(query)
+        hits = Counter()
+        # Every trigram's posting counts: the rarest one may come from the
+        # typo itself and miss the product the query is meant to find
+        for gram in grams:
+            hits.update(self.trigrams.get(gram, ()))
+        # Containment, not Jaccard: a typo in one word of a long name still
+        # leaves most of the query's trigrams in it
+        scored = []
+        for product_id, shared in hits.most_common(FUZZY_CANDIDATES):
+            similarity = shared / len(grams)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, product_id))
+        return [(product_id, similarity) for similarity, product_id in heapq.nlargest(limit, scored)]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'built_at': self.built_at,
+                'products': len(self.products),
+                'trigrams': len(self.trigrams),
+            }
+
+_indexes = {}
+_build_locks = {}
+_lock = threading.Lock()
+
+def _build_lock(user_client):
+    with _lock:
+        return _build_locks.setdefault(user_client, threading.Lock())
+
+def get_search_index(request, products_url):
+    """
+    The tenant's search index, rebuilt when the mirror changed other than
+    through index_upsert / index_delete. None if the mirror cannot be populated.
+    """
+    user_client = request.session.get('user_client_id')
+    version, _ = get_catalog_version(user_client)
+    index = _indexes.get(user_client)
+    if index is not None and version is not None and index.version == version:
+        return index
+
+    with _build_lock(user_client):
+        index = _indexes.get(user_client)
+        version, _ = get_catalog_version(user_client)
+        if index is not None and version is not None and index.version == version:
+            return index
+        products, _ = get_mirrored_products(request, products_url)
+        if products is None:
+            return index
+        _indexes[user_client] = index = SearchIndex(products, version)
+    return index
+
+def index_upsert(request, product):
+    """
+    Apply a product just saved (and mirrored) to the tenant's index, if built
+    """
+    user_client = request.session.get('user_client_id')
+    index = _indexes.get(user_client)
+    if index is not None and product.get('product_id'):
+        index.apply(upserts=[product], version=get_catalog_version(user_client)[0])
+
+def index_delete(request, product_ids):
+    user_client = request.session.get('user_client_id')
+    index = _indexes.get(user_client)
+    if index is not None and product_ids:
+        index.apply(deletes=product_ids, version=get_catalog_version(user_client)[0])
@@ -0,0 +1,150 @@
+import csv
+from itertools import islice
+
+import pandas as pd
+
+REQUIRED_COLUMNS = ('name', 'category', 'unit')
+DECIMAL_COLUMNS = ('price', 'cost')
+INTEGER_COLUMNS = ('stock', 'minQuantity')
+UNIQUE_COLUMNS = ('sku', 'barcode')
+
+# What int() in build_product_payload accepts: "1.0" or "1e3" are refused
+INTEGER_LITERAL = r'[+-]?\d+'
+
+# Rows are validated in vectorized chunks to bound memory on large files
+CHUNK_SIZE = 50000
+
+class ValidationReport:
+    """
+    Every problem found in a product CSV, before anything is sent to the API
+    """
+
+    def __init__(self):
+        self.total_rows = 0
+        self.column_errors = []
+        self.row_errors = []   # (line, column, message)
+
+    @property
+    def valid(self):
+        return not self.column_errors and not self.row_errors
+
+    @property
+    def invalid_lines(self):
+        return sorted({line for line, _, _ in self.row_errors})
+
+    def summary(self):
+        if self.column_errors:
+            return "; ".join(self.column_errors)
+        return (f"{len(self.row_errors)} problem(s) in {len(self.invalid_lines)} "
+                f"of {self.total_rows} row(s)")
+
+    def as_rows(self):
+        for message in self.column_errors:
+            yield {'line': 1, 'column': '', 'error': message}
+        for line, column, message in sorted(self.row_errors, key=lambda error: error[0]):
+            yield {'line': line, 'column': column, 'error': message}
+
+def iter_csv_rows(path):
+    """
+    Yield (line number, row) lazily; the BOM some spreadsheets add is dropped
+    and headers and values are stripped. Both the validation and the import
+    read the file with it, so they agree on rows and line numbers (the line
+    a record ends on, as quoted values may span lines).
+    """
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        reader = csv.DictReader(handle, skipinitialspace=True)
+        reader.fieldnames = [name.strip() for name in reader.fieldnames or []]
+        for row in reader:
+            yield reader.line_num, {
+                column: value.strip() if isinstance(value, str) else value
+                for column, value in row.items()
+            }
+
+def _chunks(rows, columns):
+    """
+    DataFrames of CHUNK_SIZE rows, with the line of each row in `_line`
+    """
+    while True:
+        batch = list(islice(rows, CHUNK_SIZE))
+        if not batch:
+            return
+        chunk = pd.DataFrame.from_records(
+            # Short rows are padded with '', extra values (None key) dropped
+            [{column: row.get(column) or '' for column in columns} for _, row in batch],
+            columns=columns,
+        )
+        chunk['_line'] = [line for line, _ in batch]
+        yield chunk
+
+def _add_errors(report, chunk, mask, column, message):
+    for line in chunk.loc[mask, '_line']:
+        report.row_errors.append((int(line), column, message))
+
+def _check_chunk(report, chunk, reference_ids, seen):
+    # Required values
+    for column in REQUIRED_COLUMNS:
+        _add_errors(report, chunk, chunk[column].str.strip() == '', column, 'required')
+
+    # Numbers: empty means the API default, anything else must parse
+    for column in DECIMAL_COLUMNS + INTEGER_COLUMNS:
+        if column not in chunk:
+            continue
+        values = chunk[column].str.strip()
+        parsed = pd.to_numeric(values, errors='coerce')
+        filled = values != ''
+        _add_errors(report, chunk, filled & parsed.isna(), column, 'not a number')
+        _add_errors(report, chunk, filled & (parsed < 0), column, 'negative')
+        if column in INTEGER_COLUMNS:
+            literal = values.str.fullmatch(INTEGER_LITERAL)
+            _add_errors(report, chunk, filled & parsed.notna() & ~literal, column, 'not a whole number')
+
+    # Duplicate SKUs / barcodes, within the chunk and against earlier chunks
+    for column in UNIQUE_COLUMNS:
+        if column not in chunk:
+            continue
+        values = chunk[column].str.strip()
+        filled = values != ''
+        duplicated = filled & (values.duplicated(keep='first') | values.isin(seen[column]))
+        _add_errors(report, chunk, duplicated, column, f'duplicate {column}')
+        seen[column].update(values[filled])
+
+    # Foreign keys against the tenant's reference data
+    for column, known in reference_ids.items():
+        if known is None:
+            continue
+        values = chunk[column].str.strip()
+        _add_errors(report, chunk, (values != '') & ~values.isin(known), column, f'unknown {column}')
+
+def validate_product_csv(path, categories=None, units=None):
+    """
+    Validate a product CSV in one vectorized pass per chunk, read with
+    iter_csv_rows like the import reads it.
+
+    `categories` / `units` are the tenant's reference data (lists of dicts);
+    pass None to skip the existence check of that column.
+    """
+    report = ValidationReport()
+    reference_ids = {
+        'category': None if categories is None else {str(c.get('category_id')) for c in categories},
+        'unit': None if units is None else {str(u.get('unit_id')) for u in units},
+    }
+    seen = {column: set() for column in UNIQUE_COLUMNS}
+
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            header = next(csv.reader(handle, skipinitialspace=True), None)
+        if header is None:
+            report.column_errors.append('the file is empty')
+            return report
+        columns = [column.strip() for column in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            report.column_errors.append(f"missing column(s): {', '.join(missing)}")
+            return report
+        for chunk in _chunks(iter_csv_rows(path), columns):
+            report.total_rows += len(chunk)
+            _check_chunk(report, chunk, reference_ids, seen)
+    except (csv.Error, UnicodeDecodeError) as e:
+        report.column_errors.append(f'unreadable CSV: {e}')
+
+    return report
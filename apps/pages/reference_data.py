@@ -0,0 +1,123 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import metrics
+from .async_api_client import afetch_many
+from .cache import SWRCache
+from .utils import APIResult, detached_request, fetch_many, make_authenticated_request
+
+logger = logging.getLogger(__name__)
+
+# Reference data that rarely changes and is shared by many pages
+REFERENCE_KINDS = ('categories', 'units')
+
+def _build_cache():
+    config = getattr(settings, 'REFERENCE_DATA_CACHE', {})
+    return SWRCache(
+        'refdata',
+        ttl=config.get('TTL', 300),
+        stale_ttl=config.get('STALE_TTL', 600),
+    )
+
+reference_cache = _build_cache()
+
+def _cache_metric():
+    stats = reference_cache.get_stats()
+    return {(result,): stats[result] for result in ('hits', 'stale_hits', 'misses')}
+
+metrics.register(metrics.CallbackMetric(
+    'asiria_refdata_cache_lookups_total', 'Reference data cache lookups, by result.',
+    'counter', ('result',), _cache_metric,
+))
+
+def _cache_key(request, kind):
+    return f"{request.session.get('user_client_id')}:{kind}"
+
+def _fetch_reference(request, url):
+    response = make_authenticated_request(request, 'GET', url)
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+def _refresh_reference(api_request, url):
+    """
+    Background refresh of a stale entry, run with a detached copy of the
+    session: the live request may be finished (or clear its session) by then
+    """
+    try:
+        return _fetch_reference(api_request, url)
+    except Exception:
+        logger.warning('Reference data refresh of %s failed', url, exc_info=True)
+        return None
+
+def fetch_with_reference_cache(request, calls, consumers=None):
+    """
+    Same as utils.fetch_many, but serves the `categories` and `units` calls
+    from the per-tenant reference cache. Misses are fetched together with
+    the other calls and stored.
+    """
+    results = {}
+    pending = {}
+    api_request = None
+    for name, url in calls.items():
+        if name in REFERENCE_KINDS:
+            key = _cache_key(request, name)
+            state, data = reference_cache.lookup(key)
+            if state != SWRCache.MISS:
+                if state == SWRCache.STALE:
+                    api_request = api_request or detached_request(request)
+                    reference_cache.refresh_in_background(
+                        key, lambda url=url, api_request=api_request: _refresh_reference(api_request, url)
+                    )
+                results[name] = APIResult(name, APIResult.OK, data=data)
+                continue
+        pending[name] = url
+
+    fetched = fetch_many(request, pending, consumers)
+    for name, result in fetched.items():
+        if name in REFERENCE_KINDS and result.ok:
+            reference_cache.set(_cache_key(request, name), result.data)
+    results.update(fetched)
+
+    return {name: results[name] for name in calls}
+
+def invalidate_reference_data(request, kind):
+    """
+    Drop the cached `kind` ('categories' or 'units') of the current tenant
+    """
+    reference_cache.invalidate(_cache_key(request, kind))
+
+async def afetch_with_reference_cache(request, calls, consumers=None):
+    """
+    Async variant of fetch_with_reference_cache
+    """
+    lookups = {}
+    for name in calls:
+        if name in REFERENCE_KINDS:
+            key = await sync_to_async(_cache_key)(request, name)
+            lookups[name] = (key, await sync_to_async(reference_cache.lookup)(key))
+
+    results = {}
+    pending = {}
+    api_request = None
+    for name, url in calls.items():
+        if name in lookups and lookups[name][1][0] != SWRCache.MISS:
+            key, (state, data) = lookups[name]
+            if state == SWRCache.STALE:
+                api_request = api_request or await sync_to_async(detached_request)(request)
+                reference_cache.refresh_in_background(
+                    key, lambda url=url, api_request=api_request: _refresh_reference(api_request, url)
+                )
+            results[name] = APIResult(name, APIResult.OK, data=data)
+        else:
+            pending[name] = url
+
+    fetched = await afetch_many(request, pending, consumers)
+    for name, result in fetched.items():
+        if name in lookups and result.ok:
+            await sync_to_async(reference_cache.set)(lookups[name][0], result.data)
+    results.update(fetched)
+
+    return {name: results[name] for name in calls}
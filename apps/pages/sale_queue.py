@@ -0,0 +1,299 @@
+"""
+Write-behind submission of POS sales.
+
+A checkout is stored in the local database (QueuedSale) and acknowledged at
+once; a background worker submits queued sales to the backend in batches.
+Each terminal's sales are sent one after the other in the order they were
+rung up: a sale waiting for a retry holds back the later sales of its
+terminal, while other terminals carry on.
+
+Several worker processes may share the queue: a sale is claimed with a
+conditional UPDATE (status 'sending' plus a lease) before it is sent, so
+only one of them submits it, and a lane whose head is being sent is left
+alone by the others. A claim whose process died is taken over once its
+lease has run out.
+
+Sales are submitted with the API session of the tenant's last checkout,
+kept in memory only. After a restart a tenant's queue resumes with its next
+request to the POS.
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from . import metrics
+from .api_client import CircuitOpenError, backoff_delay, get_api_base
+from .models import QueuedSale
+from .utils import detached_request, make_authenticated_request
+
+logger = logging.getLogger(__name__)
+
+def get_sale_queue_config():
+    config = {
+        'BATCH_SIZE'  : 50,     # sales picked up per pass
+        'CONCURRENCY' : 4,      # terminals submitted in parallel
+        'INTERVAL'    : 2.0,    # seconds between passes when idle
+        'BACKOFF'     : 1.0,    # base delay before retrying a sale, in seconds
+        'BACKOFF_MAX' : 300.0,  # longest delay between two attempts
+        'LEASE'       : 60,     # seconds a claimed sale is reserved for its worker process
+    }
+    config.update(getattr(settings, 'SALE_QUEUE', {}))
+    return config
+
+def get_sales_url():
+    return f"{get_api_base()}sales/"
+
+# ----------------- Credentials -----------------
+
+_credentials = {}   # user_client -> DetachedRequest, never persisted
+_credentials_lock = threading.Lock()
+
+def remember_credentials(request):
+    """
+    Keep the request's API session to submit its tenant's sales with, and
+    resume the tenant's queue if it has sales left (e.g. after a restart)
+    """
+    user_client = request.session.get('user_client_id')
+    if user_client and request.session.get('access_token'):
+        with _credentials_lock:
+            _credentials[user_client] = detached_request(request)
+        if QueuedSale.objects.filter(user_client=user_client, status__in=OPEN_STATUSES).exists():
+            ensure_sale_queue_worker()
+            _wakeup.set()
+
+def _forget_credentials(user_client, api_request):
+    with _credentials_lock:
+        # Unless a newer session was remembered meanwhile
+        if _credentials.get(user_client) is api_request:
+            del _credentials[user_client]
+
+# ----------------- Enqueue -----------------
+
+def enqueue_sale(request, terminal, sale_id, payload):
+    """
+    Store a sale for submission. Enqueueing the same sale_id again (e.g. a
+    double-tapped checkout) returns the sale already queued.
+    Returns (QueuedSale, created).
+    """
+    user_client = request.session.get('user_client_id')
+    body = dict(payload, sale_id=str(sale_id), user_client=user_client, terminal=terminal)
+    sale, created = QueuedSale.objects.get_or_create(
+        user_client=user_client, sale_id=sale_id,
+        defaults={'terminal': terminal, 'payload': body},
+    )
+    remember_credentials(request)
+    ensure_sale_queue_worker()
+    if created:
+        _wakeup.set()
+    return sale, created
+
+# ----------------- Submission -----------------
+
+SENT = 'sent'
+RETRY = 'retry'
+REJECTED = 'rejected'
+UNAUTHORIZED = 'unauthorized'
+
+def _submit(api_request, sale):
+    """
+    POST one sale; returns (outcome, error message)
+    """
+    try:
+        response = make_authenticated_request(api_request, 'POST', get_sales_url(), data=sale.payload)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, CircuitOpenError) as e:
+        return RETRY, type(e).__name__
+    # 409: the backend already has this sale_id, i.e. an earlier attempt got through
+    if response.status_code in (200, 201, 202, 409):
+        return SENT, ''
+    if response.status_code == 401:
+        return UNAUTHORIZED, 'HTTP 401'
+    error = f"HTTP {response.status_code}: {response.text[:500]}"
+    if response.status_code in (408, 429) or response.status_code >= 500:
+        return RETRY, error
+    return REJECTED, error
+
+OPEN_STATUSES = (QueuedSale.STATUS_PENDING, QueuedSale.STATUS_SENDING)
+
+def _claimable(now):
+    # Pending, or claimed by a process that did not finish within its lease
+    return Q(status=QueuedSale.STATUS_PENDING) | Q(status=QueuedSale.STATUS_SENDING, lease_until__lt=now)
+
+def _claim(sale, config):
+    """
+    Reserve `sale` for this process; False if another one holds it
+    """
+    now = timezone.now()
+    claimed = QueuedSale.objects.filter(_claimable(now), id=sale.id).update(
+        status=QueuedSale.STATUS_SENDING, lease_until=now + timedelta(seconds=config['LEASE']),
+    )
+    return claimed == 1
+
+def _submit_lane(api_request, sales, config):
+    """
+    Send the due sales of one terminal in order; stop at the first one that
+    has to wait. Returns the number of sales sent.
+    """
+    sent = 0
+    try:
+        for sale in sales:
+            if sale.next_attempt_at > timezone.now() or not _claim(sale, config):
+                break
+            outcome, error = _submit(api_request, sale)
+            metrics.sale_queue_submissions.inc(outcome=outcome)
+            if outcome == UNAUTHORIZED:
+                # Session expired: wait for the tenant's next request to bring a new one
+                _forget_credentials(sale.user_client, api_request)
+                QueuedSale.objects.filter(id=sale.id).update(status=QueuedSale.STATUS_PENDING, lease_until=None)
+                break
+            sale.attempts += 1
+            sale.last_error = error
+            sale.lease_until = None
+            if outcome == SENT:
+                sale.status = QueuedSale.STATUS_SENT
+                sale.sent_at = timezone.now()
+                sent += 1
+            elif outcome == REJECTED:
+                # Will never be accepted as is: keep it for review, unblock the terminal
+                logger.warning('Sale %s rejected by the backend: %s', sale.sale_id, error)
+                sale.status = QueuedSale.STATUS_FAILED
+            else:
+                delay = backoff_delay(config['BACKOFF'], sale.attempts, config['BACKOFF_MAX'])
+                sale.status = QueuedSale.STATUS_PENDING
+                sale.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            sale.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'lease_until', 'sent_at'])
+            if outcome == RETRY:
+                break
+    finally:
+        # Pool threads' DB connections are not managed by the request cycle
+        connection.close()
+    return sent
+
+def submit_pending_sales(config=None):
+    """
+    One pass over the queue: about BATCH_SIZE pending sales of the tenants
+    we hold a session for, terminals in parallel. Returns (picked, sent).
+    """
+    config = config or get_sale_queue_config()
+    with _credentials_lock:
+        sessions = dict(_credentials)
+    if not sessions:
+        return 0, 0
+
+    open_sales = QueuedSale.objects.filter(status__in=OPEN_STATUSES, user_client__in=list(sessions))
+    # Lanes (tenant, terminal) whose oldest open sale is due and not being sent
+    # by another process; the batch is shared between them so a backlog on
+    # one terminal does not starve the others
+    heads = open_sales.values('user_client', 'terminal').annotate(head=Min('id')).values_list('head', flat=True)
+    now = timezone.now()
+    due = list(
+        QueuedSale.objects.filter(_claimable(now), id__in=list(heads), next_attempt_at__lte=now)
+        .values_list('user_client', 'terminal')
+    )
+    if not due:
+        return 0, 0
+    per_lane = max(1, config['BATCH_SIZE'] // len(due))
+    lanes = {
+        (user_client, terminal): list(open_sales.filter(user_client=user_client, terminal=terminal).order_by('id')[:per_lane])
+        for user_client, terminal in due[:config['BATCH_SIZE']]
+    }
+    picked = sum(len(lane) for lane in lanes.values())
+
+    workers = max(1, min(config['CONCURRENCY'], len(lanes)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sale-queue') as pool:
+        futures = [
+            pool.submit(_submit_lane, sessions[user_client], lane, config)
+            for (user_client, _), lane in lanes.items()
+        ]
+        sent = sum(future.result() for future in futures)
+    return picked, sent
+
+class SaleQueueWorker(threading.Thread):
+    """
+    Daemon thread draining the sale queue: right away after a checkout,
+    back to back while batches come back full, else every INTERVAL seconds
+    """
+
+    def __init__(self):
+        super().__init__(name='sale-queue-worker', daemon=True)
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            config = get_sale_queue_config()
+            _wakeup.clear()
+            try:
+                picked, sent = submit_pending_sales(config)
+            except Exception:
+                logger.exception('Sale queue pass failed')
+                picked, sent = 0, 0
+            finally:
+                connection.close()
+            if picked >= config['BATCH_SIZE'] and sent:
+                continue
+            _wakeup.wait(config['INTERVAL'])
+
+    def stop(self):
+        self._stopped.set()
+        _wakeup.set()
+
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def ensure_sale_queue_worker():
+    """
+    Start the queue worker of this process, once
+    """
+    global _worker, _worker_pid
+    pid = os.getpid()
+    if _worker is not None and _worker_pid == pid:
+        return
+    with _worker_lock:
+        if _worker is None or _worker_pid != pid:
+            _worker = SaleQueueWorker()
+            _worker_pid = pid
+            _worker.start()
+
+# ----------------- Status -----------------
+
+def get_queue_status(user_client, terminal=None):
+    """
+    Depth and lag of a tenant's queue (or of one of its terminals)
+    """
+    sales = QueuedSale.objects.filter(user_client=user_client)
+    if terminal:
+        sales = sales.filter(terminal=terminal)
+    now = timezone.now()
+
+    pending = sales.filter(status__in=OPEN_STATUSES)
+    terminals = {
+        row['terminal']: {
+            'depth': row['depth'],
+            'lag_seconds': round((now - row['oldest']).total_seconds(), 1),
+        }
+        for row in pending.values('terminal').annotate(depth=Count('id'), oldest=Min('created_at'))
+    }
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    last_sent = sales.filter(status=QueuedSale.STATUS_SENT).order_by('-sent_at').values_list('sent_at', flat=True).first()
+    with _credentials_lock:
+        has_session = user_client in _credentials
+
+    return {
+        'depth': sum(item['depth'] for item in terminals.values()),
+        # Age of the oldest sale not yet accepted by the backend
+        'lag_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+        'failed': sales.filter(status=QueuedSale.STATUS_FAILED).count(),
+        'last_sent_at': last_sent.isoformat() if last_sent else None,
+        'terminals': terminals,
+        'submitting': has_session and _worker is not None and _worker.is_alive(),
+    }
@@ -1,3 +1,149 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import SimpleTestCase, TestCase
+
+from . import async_api_client, sale_queue, utils
+from .api_client import APIClient, CircuitBreaker, get_api_base
+from .models import QueuedSale
+from .product_search import SearchIndex
+from .product_validation import iter_csv_rows, validate_product_csv
+
+def _product(product_id, name):
+    return {'product_id': product_id, 'name': name, 'sku': '', 'barcode': '', 'price': '1.00'}
+
+class ProductSearchTests(SimpleTestCase):
+
+    def test_fuzzy_match_when_rarest_trigram_is_the_typo(self):
+        # "afe" of "chocolafe" is only in "Cafe Latte", not in the chocolate bars
+        products = [_product(str(i), f"Chocolate Bar {i}") for i in range(5)]
+        products.append(_product('latte', 'Cafe Latte'))
+        index = SearchIndex(products, 1)
+
+        names = [product.name for product in index.search('chocolafe', limit=5)]
+
+        self.assertEqual(len(names), 5)
+        self.assertTrue(all(name.startswith('Chocolate Bar') for name in names))
+
+    def test_fuzzy_match_of_one_word_in_a_long_name(self):
+        index = SearchIndex([
+            _product('1', 'Cadbury Dairy Milk Chocolate 200g'),
+            _product('2', 'Brookside Fresh Milk 500ml'),
+        ], 1)
+
+        self.assertEqual([p.product_id for p in index.search('choclate')], ['1'])
+        self.assertEqual([p.product_id for p in index.search('brokside')], ['2'])
+
+class SaleQueueTests(TestCase):
+
+    def setUp(self):
+        # A freshly started process: no sessions held, no worker running
+        patcher = mock.patch.dict(sale_queue._credentials, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sale_queue._wakeup.clear()
+
+    def _pos_request(self, user_client):
+        return SimpleNamespace(session={'user_client_id': user_client, 'access_token': 'token'})
+
+    @mock.patch.object(sale_queue, 'ensure_sale_queue_worker')
+    def test_pos_request_resumes_queue_after_restart(self, ensure_worker):
+        QueuedSale.objects.create(user_client='tenant', terminal='till-1', sale_id=uuid.uuid4(), payload={})
+
+        sale_queue.remember_credentials(self._pos_request('tenant'))
+
+        ensure_worker.assert_called_once_with()
+        self.assertTrue(sale_queue._wakeup.is_set())
+        self.assertIn('tenant', sale_queue._credentials)
+
+    @mock.patch.object(sale_queue, 'ensure_sale_queue_worker')
+    def test_pos_request_without_queued_sales_starts_nothing(self, ensure_worker):
+        sale_queue.remember_credentials(self._pos_request('tenant'))
+
+        ensure_worker.assert_not_called()
+        self.assertFalse(sale_queue._wakeup.is_set())
+
+class CircuitBreakerProbeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        # Half-open right away, one probe allowed
+        self.client.breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0, half_open_probes=1)
+        self.client.breaker.record_failure()
+        self.url = f"{get_api_base()}products/"
+
+    def test_probe_failing_on_our_side_is_given_back(self):
+        with mock.patch.object(self.client.session, 'request', side_effect=ValueError('bad arguments')):
+            with self.assertRaises(ValueError):
+                self.client._send('GET', self.url)
+
+        self.client.breaker.before_call()  # the next probe is let through
+
+    def test_async_probe_failing_on_our_side_is_given_back(self):
+        client = async_api_client.AsyncAPIClient()
+        with mock.patch.object(async_api_client, 'get_api_client', return_value=self.client), \
+                mock.patch.object(client.client, 'request', side_effect=ValueError('bad arguments')):
+            with self.assertRaises(ValueError):
+                asyncio.run(client._send('GET', self.url))
+
+        self.client.breaker.before_call()
+
+class DetachedTokenRefreshTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(utils._refresh_outcomes, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = SessionStore()
+        self.session.update({'access_token': 'access-1', 'refresh_token': 'refresh-1', 'user_client_id': 'tenant'})
+        self.session.create()
+        self.job = utils.DetachedRequest(self.session.items(), self.session.session_key)
+
+    def test_rotated_refresh_token_is_written_back_to_the_session(self):
+        with mock.patch.object(utils, '_request_token_refresh', return_value=('access-2', 'refresh-2', time.time())):
+            self.assertTrue(utils.refresh_api_token(self.job))
+
+        stored = SessionStore(self.session.session_key)
+        self.assertEqual(stored['refresh_token'], 'refresh-2')
+        self.assertEqual(stored['access_token'], 'access-2')
+        self.assertEqual(self.job.session['refresh_token'], 'refresh-2')
+
+    def test_tokens_refreshed_by_the_user_are_taken_over(self):
+        self.session.update({'access_token': 'access-2', 'refresh_token': 'refresh-2'})
+        self.session.save()
+
+        with mock.patch.object(utils, '_request_token_refresh') as token_refresh:
+            self.assertTrue(utils.refresh_api_token(self.job))
+
+        token_refresh.assert_not_called()
+        self.assertEqual(self.job.session['refresh_token'], 'refresh-2')
+
+class ProductCsvLineTests(SimpleTestCase):
+
+    def _write_csv(self, text):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='') as csv_file:
+            csv_file.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_validation_and_import_report_the_same_lines(self):
+        path = self._write_csv(
+            'name,category,unit,description,stock\n'
+            'Milk,c1,u1,"Fresh\nfrom the farm",2\n'
+            '\n'
+            'Bread,c1,u1,,1.0\n'
+        )
+
+        report = validate_product_csv(path)
+        import_lines = {row['name']: line for line, row in iter_csv_rows(path)}
+
+        self.assertEqual(report.total_rows, 2)
+        self.assertEqual(report.row_errors, [(import_lines['Bread'], 'stock', 'not a whole number')])
+        self.assertEqual(import_lines['Bread'], 5)
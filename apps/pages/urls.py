@@ -1,26 +1,43 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
+# I/O-bound views have async twins for ASGI deployments
+if getattr(settings, 'ASYNC_VIEWS', False):
+    from . import async_views as io_views
+else:
+    io_views = views
+
 urlpatterns = [
     path('', views.index, name='index'),
-    path('register/', views.register, name='register'),
-    path('accounts/login/', views.login, name='login'),
+    path('register/', io_views.register, name='register'),
+    path('accounts/login/', io_views.login, name='login'),
     path('accounts/logout/', views.logout, name='logout'),
-    path('dashboard-api/sales/today/', views.get_todays_sales, name='get_todays_sales'),
+    path('dashboard-api/sales/today/', io_views.get_todays_sales, name='get_todays_sales'),
+    path('dashboard-api/snapshot/', views.dashboard_snapshot, name='dashboard_snapshot'),
+    path('dashboard-api/cache/stats/', views.cache_stats, name='cache_stats'),
+    path('metrics', views.api_metrics, name='api_metrics'),
     path('test-api/', views.test_api_auth, name='test_api_auth'),
     # App sections
     path('pos/', views.pos, name='pos'),
+    path('pos/lookup/', views.pos_lookup, name='pos_lookup'),
+    path('pos/catalog/stats/', views.pos_catalog_stats, name='pos_catalog_stats'),
+    path('pos/checkout/', views.pos_checkout, name='pos_checkout'),
+    path('pos/queue/status/', views.pos_queue_status, name='pos_queue_status'),
     path('purchases/', views.purchases, name='purchases'),
 
-    path('inventory/', views.inventory, name='inventory'),
+    path('inventory/', io_views.inventory, name='inventory'),
     path("inventory/add/", views.add_product, name="add_product"),
     # path("inventory/<int:product_id>/edit/", views.edit_product, name="edit_product"),
     path("inventory/edit/<uuid:product_id>/", views.edit_product, name="edit_product"),
     path("inventory/delete/", views.delete_products, name="delete_products"),
+    path("inventory/search/", views.product_search, name="product_search"),
     path("inventory/upload/", views.upload_products_csv, name="upload_products_csv"),
+    path("inventory/upload/<uuid:job_id>/progress/", views.upload_products_progress, name="upload_products_progress"),
+    path("inventory/upload/<uuid:job_id>/errors/", views.upload_products_errors, name="upload_products_errors"),
 
-    path("inventory/management/", views.product_management, name="product_management"),
+    path("inventory/management/", io_views.product_management, name="product_management"),
 
     path("inventory/category/add/", views.add_category, name="add_category"),
     path("inventory/category/edit/<uuid:category_id>/", views.edit_category, name="edit_category"),
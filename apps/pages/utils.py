@@ -1,6 +1,19 @@
+import base64
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
 import requests
 from django.conf import settings
 
+from . import metrics
+from .api_client import DeadlineExceeded, get_api_base, get_api_client, get_client_config
+
+logger = logging.getLogger(__name__)
+
 def get_api_headers(request):
     """
     Get headers for API requests including authentication token
@@ -16,32 +29,210 @@ def get_api_headers(request):
     
     return headers
 
-def refresh_api_token(request):
+def token_expiry(token):
+    """
+    Return the `exp` claim of a JWT as a unix timestamp, or None.
+    The signature is not verified: this is only used to schedule refreshes.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return None
+
+def token_expires_soon(request):
+    """
+    True when the session's access token expires within TOKEN_REFRESH_LEEWAY
+    """
+    access_token = request.session.get('access_token')
+    if not access_token:
+        return False
+    expires_at = token_expiry(access_token)
+    if expires_at is None:
+        return False
+    return expires_at - time.time() <= get_client_config()['TOKEN_REFRESH_LEEWAY']
+
+# Single-flight state: one in-flight refresh per refresh token, and the outcome
+# of recent refreshes so that callers that waited reuse it instead of refreshing again.
+# Only definitive outcomes are kept: after a transient failure the next caller tries again.
+_refresh_guard = threading.Lock()
+_refresh_locks = {}
+_refresh_outcomes = {}
+REFRESH_OUTCOME_TTL = 30
+
+def _refresh_lock_for(refresh_token):
+    now = time.time()
+    with _refresh_guard:
+        for token, (_, _, finished_at) in list(_refresh_outcomes.items()):
+            if now - finished_at > REFRESH_OUTCOME_TTL:
+                _refresh_outcomes.pop(token, None)
+                _refresh_locks.pop(token, None)
+        return _refresh_locks.setdefault(refresh_token, threading.Lock())
+
+def _apply_refresh(request, access_token, rotated_refresh_token):
+    # Write the session once, even if several threads share it
+    if request.session.get('access_token') != access_token:
+        request.session['access_token'] = access_token
+    if rotated_refresh_token and request.session.get('refresh_token') != rotated_refresh_token:
+        request.session['refresh_token'] = rotated_refresh_token
+
+def refresh_api_token(request, clear_on_failure=True):
     """
-    Refresh the API access token using the refresh token
+    Refresh the API access token using the refresh token.
+
+    Concurrent refreshes for the same session are collapsed into one call
+    to the token endpoint; the others wait and reuse its outcome. The session
+    is only cleared when the backend rejects the refresh token, not when the
+    token endpoint could not be reached.
+
+    A background job's DetachedRequest first takes on the tokens of the
+    user's session if it refreshed meanwhile, and writes its own refresh
+    back to it, so that a rotated refresh token never stays in the copy only.
     """
     refresh_token = request.session.get('refresh_token')
     if not refresh_token:
         return False
-    
+    detached = isinstance(request, DetachedRequest)
+
+    with _refresh_lock_for(refresh_token):
+        outcome = _refresh_outcomes.get(refresh_token)
+        if outcome is None:
+            if detached and request.adopt_stored_tokens():
+                return True
+            outcome = _request_token_refresh(refresh_token)
+            if outcome is None:
+                # Transient failure: keep the session, a later request retries
+                return False
+            with _refresh_guard:
+                _refresh_outcomes[refresh_token] = outcome
+
+        access_token, rotated_refresh_token, _ = outcome
+        if access_token and detached:
+            request.store_tokens(refresh_token, access_token, rotated_refresh_token)
+
+    if access_token:
+        _apply_refresh(request, access_token, rotated_refresh_token)
+        return True
+
+    # Refresh token rejected, clear session
+    if clear_on_failure:
+        clear_api_session(request)
+    return False
+
+def _request_token_refresh(refresh_token):
+    """
+    Call the refresh endpoint; returns (access, rotated refresh, finished_at),
+    with no access token if the refresh token was rejected (400/401), or
+    None if the endpoint failed otherwise
+    """
     try:
-        response = requests.post(
-            'http://127.0.0.1:8080/api/token/refresh/',
+        response = get_api_client().post(
+            f"{get_api_base()}token/refresh/",
             json={'refresh': refresh_token},
             headers={'Content-Type': 'application/json'}
         )
-        
         if response.status_code == 200:
             data = response.json()
-            request.session['access_token'] = data.get('access')
-            return True
-        else:
-            # Refresh failed, clear session
-            clear_api_session(request)
-            return False
+            metrics.api_token_refreshes.inc(outcome='refreshed')
+            return data.get('access'), data.get('refresh'), time.time()
+        if response.status_code in (400, 401):
+            metrics.api_token_refreshes.inc(outcome='rejected')
+            return None, None, time.time()
+        metrics.api_token_refreshes.inc(outcome='error')
     except Exception:
-        clear_api_session(request)
-        return False
+        metrics.api_token_refreshes.inc(outcome='error')
+    return None
+
+def store_api_session(request, api_data):
+    """
+    Store the tokens and user details returned by the token endpoint
+    """
+    # Store API tokens and user data in session
+    request.session['access_token'] = api_data.get('access')
+    request.session['refresh_token'] = api_data.get('refresh')
+    request.session['user_client_id'] = api_data.get('user_client_id')
+
+    # Store user details from login response
+    request.session['user_name'] = api_data.get('client_name', 'User')
+    request.session['store_name'] = api_data.get('storename', '')
+    request.session['user_role'] = api_data.get('role', 'Client')
+
+    # Mark user as authenticated in session
+    request.session['is_authenticated'] = True
+
+class DetachedRequest:
+    """
+    Stand-in for a request in work that outlives it (background jobs).
+    Carries a copy of the API session, so make_authenticated_request and
+    token refreshes keep working after the response has been sent; the
+    tokens are kept in step with the user's stored session (session_key).
+    """
+
+    def __init__(self, session, session_key=None):
+        self.session = dict(session)
+        self.session_key = session_key
+
+    def _stored_session(self):
+        return import_module(settings.SESSION_ENGINE).SessionStore(self.session_key)
+
+    def adopt_stored_tokens(self):
+        """
+        Take the tokens of the user's session if it was refreshed since this
+        copy was made; True if it was
+        """
+        if not self.session_key:
+            return False
+        try:
+            stored = self._stored_session()
+            refresh_token = stored.get('refresh_token')
+        except Exception:
+            logger.warning('Could not read the session of a background job', exc_info=True)
+            return False
+        if not refresh_token or refresh_token == self.session.get('refresh_token'):
+            return False
+        self.session['access_token'] = stored.get('access_token')
+        self.session['refresh_token'] = refresh_token
+        return True
+
+    def store_tokens(self, previous_refresh_token, access_token, rotated_refresh_token):
+        """
+        Write a refresh made with this copy back to the user's session, unless
+        that one moved on meanwhile (logged out, logged in again or refreshed)
+        """
+        if not self.session_key:
+            return
+        try:
+            stored = self._stored_session()
+            if stored.get('refresh_token') != previous_refresh_token:
+                return
+            stored['access_token'] = access_token
+            stored['refresh_token'] = rotated_refresh_token or previous_refresh_token
+            stored.save()
+        except Exception:
+            logger.warning('Could not write refreshed tokens back to the session', exc_info=True)
+
+def detached_request(request):
+    return DetachedRequest(request.session.items(), getattr(request.session, 'session_key', None))
+
+def build_product_payload(source, user_client):
+    """
+    Product body for the API from a POST QueryDict or a CSV row.
+    Raises ValueError on non-numeric quantities.
+    """
+    return {
+        "user_client": user_client,                      # UUID string
+        "category": source.get("category"),              # UUID string
+        "unit": source.get("unit"),                      # UUID string
+        "name": source.get("name"),
+        "sku": source.get("sku") or "",
+        "barcode": source.get("barcode") or "",
+        "description": source.get("description") or "",
+        "minQuantity": int(source.get("minQuantity") or 0),
+        "price": str(source.get("price") or "0.00"),
+        "cost": str(source.get("cost") or "0.00"),
+        "stock": int(source.get("stock") or 0),
+    }
 
 def clear_api_session(request):
     """
@@ -61,16 +252,102 @@ def clear_api_session(request):
         if key in request.session:
             del request.session[key]
 
+class RequestMemo:
+    """
+    Responses of the authenticated GETs made while serving one Django
+    request. Identical GETs, even from parallel fan-out threads, share the
+    first call: later callers wait for it instead of calling the backend.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_call(self, key, call):
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = {'done': threading.Event(), 'response': None}
+        if not owner:
+            entry['done'].wait()
+            if entry['response'] is not None:
+                return entry['response']
+            # The first call failed: make our own
+            return call()
+        try:
+            response = call()
+            if response.status_code == 200:
+                # Read the body now: the response is shared by every caller
+                response.content
+                entry['response'] = response
+            else:
+                with self._lock:
+                    self._entries.pop(key, None)
+            return response
+        except Exception:
+            with self._lock:
+                self._entries.pop(key, None)
+            raise
+        finally:
+            entry['done'].set()
+
+    def peek(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry['done'].is_set():
+            return entry['response']
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _memo_key(url, kwargs):
+    params = kwargs.get('params')
+    return url, tuple(sorted(params.items())) if isinstance(params, dict) else params
+
 def make_authenticated_request(request, method, url, data=None, **kwargs):
     """
-    Make an authenticated API request with automatic token refresh
+    Make an authenticated API request with automatic token refresh.
+
+    Within a Django request (see middleware.api_request_scope_middleware),
+    identical GETs are sent once and share the response. Any write clears
+    the memo, so later reads see it.
     """
+    memo = getattr(request, 'api_memo', None)
+    if memo is not None:
+        if method.upper() != 'GET':
+            memo.clear()
+        elif kwargs.get('stream'):
+            # A streamed GET cannot be shared, but can reuse a full copy
+            cached = memo.peek(_memo_key(url, kwargs))
+            if cached is not None:
+                return cached
+        else:
+            return memo.get_or_call(
+                _memo_key(url, kwargs),
+                lambda: _send_authenticated(request, method, url, data, **kwargs),
+            )
+    return _send_authenticated(request, method, url, data, **kwargs)
+
+def _send_authenticated(request, method, url, data=None, **kwargs):
+    # Refresh shortly before expiry instead of paying for a 401 round trip
+    # (a failed early refresh keeps the session: the 401 path below decides)
+    if token_expires_soon(request):
+        refresh_api_token(request, clear_on_failure=False)
+
     headers = get_api_headers(request)
+    client = get_api_client()
+    tenant = request.session.get('user_client_id')
+    # Time budget of the whole Django request, see middleware.open_request_scope
+    kwargs.setdefault('deadline', getattr(request, 'api_deadline', None))
     
     # Make the request
-    response = requests.request(
+    response = client.request(
         method=method,
         url=url,
+        tenant=tenant,
         json=data,
         headers=headers,
         **kwargs
@@ -80,13 +357,105 @@ def make_authenticated_request(request, method, url, data=None, **kwargs):
     if response.status_code == 401:
         if refresh_api_token(request):
             # Retry with new token
+            metrics.record_retry(url, 'unauthorized')
+            response.close()
             headers = get_api_headers(request)
-            response = requests.request(
+            response = client.request(
                 method=method,
                 url=url,
+                tenant=tenant,
                 json=data,
                 headers=headers,
                 **kwargs
             )
     
-    return response 
\ No newline at end of file
+    return response
+
+class APIResult:
+    """
+    Outcome of a single call made by fetch_many
+    """
+
+    OK = 'ok'
+    HTTP_ERROR = 'http_error'
+    OFFLINE = 'offline'
+    # Not sent, or cut short, because the request ran out of time
+    SKIPPED = 'skipped'
+    ERROR = 'error'
+
+    def __init__(self, name, status, response=None, data=None, error=None):
+        self.name = name
+        self.status = status
+        self.response = response
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == self.OK
+
+    @property
+    def offline(self):
+        return self.status == self.OFFLINE
+
+    @property
+    def skipped(self):
+        return self.status == self.SKIPPED
+
+    @property
+    def status_code(self):
+        return self.response.status_code if self.response is not None else None
+
+    def __repr__(self):
+        return f"<APIResult {self.name}: {self.status} {self.status_code}>"
+
+def _fetch_one(request, name, url, consumer=None):
+    response = None
+    try:
+        response = make_authenticated_request(request, 'GET', url, stream=consumer is not None)
+        if response.status_code != 200:
+            return APIResult(name, APIResult.HTTP_ERROR, response=response)
+        if consumer is not None:
+            # Decode the list item by item and hand it to the consumer in one pass
+            data = consumer(get_api_client().iter_items(response))
+        else:
+            data = response.json()
+        return APIResult(name, APIResult.OK, response=response, data=data)
+    except DeadlineExceeded as e:
+        return APIResult(name, APIResult.SKIPPED, error=e)
+    except requests.exceptions.ConnectionError as e:
+        # A read timeout while streaming the body surfaces as a ConnectionError
+        deadline = getattr(request, 'api_deadline', None)
+        if deadline is not None and deadline.expired:
+            deadline.degraded = True
+            return APIResult(name, APIResult.SKIPPED, error=e)
+        return APIResult(name, APIResult.OFFLINE, error=e)
+    except ValueError as e:
+        return APIResult(name, APIResult.ERROR, response=response, error=e)
+    except Exception as e:
+        return APIResult(name, APIResult.ERROR, error=e)
+
+def fetch_many(request, calls, consumers=None, max_workers=None):
+    """
+    Run independent authenticated GETs at the same time.
+
+    `calls` maps a name to a URL. Returns a dict of name -> APIResult, so the
+    page waits for the slowest call instead of the sum of all of them.
+    Errors are reported per call and never raised.
+
+    `consumers` optionally maps a name to a function that receives an
+    iterator over the items of that (JSON list) response, streamed and
+    decoded one at a time; its return value becomes the result's data.
+    """
+    if not calls:
+        return {}
+    consumers = consumers or {}
+    max_workers = max_workers or get_client_config()['FANOUT_WORKERS']
+    workers = max(1, min(max_workers, len(calls)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-fanout') as pool:
+        futures = {
+            name: pool.submit(_fetch_one, request, name, url, consumers.get(name))
+            for name, url in calls.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
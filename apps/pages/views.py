@@ -1,18 +1,41 @@
-import requests
-from django.shortcuts import render, redirect
+import json
+import os
+import time
+import uuid
+from decimal import Decimal
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
-from django.contrib.auth import login as auth_login
-from django.contrib.auth.models import User
-from django.contrib.auth.decorators import login_required
 from .forms import RegistrationForm, LoginForm
-from .decorators import api_login_required
-from .utils import clear_api_session
-from django.http import JsonResponse
-from .utils import make_authenticated_request
+from .decorators import api_deadline, api_login_required
+from .utils import clear_api_session, store_api_session
+from django.conf import settings
+from django.utils import timezone
+from django.http import JsonResponse, FileResponse, Http404, HttpResponse
+from .utils import make_authenticated_request, build_product_payload
+from .models import ProductImportJob
+from .product_import import start_import, error_report_path
+from .api_client import get_api_base, get_api_client, CircuitOpenError, DeadlineExceeded
+from .bulk import bulk_delete
+from .metrics import render_metrics
+from .reference_data import invalidate_reference_data, reference_cache
+from .catalog_mirror import fetch_with_catalog_mirror, mirror_delete, mirror_upsert
+from .pos_catalog import get_pos_catalog
+from .product_search import get_search_index, index_delete, index_upsert
+from .sale_queue import enqueue_sale, get_queue_status, remember_credentials
+from .dashboard import dashboard_cache, get_snapshot
 
 # Create your views here.
 
-API_BASE = "http://127.0.0.1:8080/api/"
+# Endpoint URLs are built on the first of settings.API_BACKENDS; the API client
+# balances each call over all of them
+API_BASE = get_api_base()
+
+# Seconds the dashboard's sales widget may wait on the backend in total
+TODAYS_SALES_DEADLINE = 5
+# Same for the pages that fan out several GETs and can render partial data
+PAGE_DEADLINE = 10
 
 @api_login_required
 def index(request):
@@ -21,6 +44,7 @@ def index(request):
     return render(request, 'pages/index.html')
 
 @api_login_required
+@api_deadline(TODAYS_SALES_DEADLINE)
 def get_todays_sales(request):
     """
     Fetch today's sales data from the API
@@ -40,29 +64,52 @@ def get_todays_sales(request):
                 {'error': f'API Error: {response.status_code}'}, 
                 status=response.status_code
             )
+    except CircuitOpenError:
+        # Fail fast while the backend is known to be down
+        return JsonResponse({'error': 'Backend API is offline'}, status=503)
+    except DeadlineExceeded:
+        return JsonResponse({'error': 'Backend API is too slow'}, status=504)
     except Exception as e:
         return JsonResponse(
             {'error': f'Connection Error: {str(e)}'}, 
             status=500
         )
 
+@api_login_required
+@api_deadline(TODAYS_SALES_DEADLINE)
+def dashboard_snapshot(request):
+    """
+    All dashboard KPIs in one response, from the per-tenant snapshot cache
+    """
+    snapshot, state = get_snapshot(request)
+    return JsonResponse(dict(
+        snapshot,
+        # Local and cheap: always current
+        queued_sales=get_queue_status(request.session.get("user_client_id"))["depth"],
+        cache=state,
+        age_seconds=round(time.time() - snapshot["generated_at"], 1),
+    ))
+
+def _registration_payload(form):
+    return {
+        'storename': form.cleaned_data['storename'],
+        'client_name': form.cleaned_data['client_name'],
+        'phone_number': form.cleaned_data['phone_number'],
+        'email': form.cleaned_data['email'],
+        'password': form.cleaned_data['password'],
+        'password_confirmation': form.cleaned_data['password_confirmation'],
+        'address': form.cleaned_data['address'],
+    }
+
 def register(request):
     success_message = None
     error_message = None
     if request.method == 'POST':
         form = RegistrationForm(request.POST)
         if form.is_valid():
-            data = {
-                'storename': form.cleaned_data['storename'],
-                'client_name': form.cleaned_data['client_name'],
-                'phone_number': form.cleaned_data['phone_number'],
-                'email': form.cleaned_data['email'],
-                'password': form.cleaned_data['password'],
-                'password_confirmation': form.cleaned_data['password_confirmation'],
-                'address': form.cleaned_data['address'],
-            }
+            data = _registration_payload(form)
             try:
-                response = requests.post(f"{API_BASE}clients/", json=data)
+                response = get_api_client().post(f"{API_BASE}clients/", json=data)
                 print(f"API POST response: {response.status_code} {response.text}")  # Debug print
                 if response.status_code == 201:
                     success_message = 'Registration successful! You can now log in.'
@@ -81,6 +128,19 @@ def register(request):
     print(f"Rendering register page with success_message: {success_message}, error_message: {error_message}")  # Debug print
     return render(request, 'accounts/register.html', {'form': form, 'success_message': success_message, 'error_message': error_message})
 
+def _login_error_message(response):
+    # Handle specific error cases
+    try:
+        error_data = response.json()
+        if response.status_code == 401:
+            return "Invalid phone number or password. Please check your credentials."
+        elif 'detail' in error_data:
+            return f"Login failed: {error_data['detail']}"
+        else:
+            return f"Login failed: {response.text}"
+    except:
+        return f"Login failed: {response.text}"
+
 def login(request):
     success_message = None
     error_message = None
@@ -92,40 +152,17 @@ def login(request):
                 'password': form.cleaned_data['password'],
             }
             try:
-                response = requests.post(f"{API_BASE}token/", json=data)
+                response = get_api_client().post(f"{API_BASE}token/", json=data)
                 print(f"API Login response: {response.status_code} {response.text}")  # Debug print
                 
                 if response.status_code == 200:
                     # API returns JWT tokens and user data directly
-                    api_data = response.json()
-                    
-                    # Store API tokens and user data in session
-                    request.session['access_token'] = api_data.get('access')
-                    request.session['refresh_token'] = api_data.get('refresh')
-                    request.session['user_client_id'] = api_data.get('user_client_id')
-                    
-                    # Store user details from login response
-                    request.session['user_name'] = api_data.get('client_name', 'User')
-                    request.session['store_name'] = api_data.get('storename', '')
-                    request.session['user_role'] = api_data.get('role', 'Client')
-                    
-                    # Mark user as authenticated in session
-                    request.session['is_authenticated'] = True
+                    store_api_session(request, response.json())
                     
                     success_message = 'Login successful!'
                     return redirect('index')  # or wherever you want to redirect after login
                 else:
-                    # Handle specific error cases
-                    try:
-                        error_data = response.json()
-                        if response.status_code == 401:
-                            error_message = "Invalid phone number or password. Please check your credentials."
-                        elif 'detail' in error_data:
-                            error_message = f"Login failed: {error_data['detail']}"
-                        else:
-                            error_message = f"Login failed: {response.text}"
-                    except:
-                        error_message = f"Login failed: {response.text}"
+                    error_message = _login_error_message(response)
             except Exception as e:
                 error_message = f"API Connection Error: {e}"
         else:
@@ -170,7 +207,7 @@ def test_api_auth(request):
         results = []
         for i, data in enumerate(test_cases):
             try:
-                response = requests.post('http://127.0.0.1:8080/api/token/', json=data)
+                response = get_api_client().post(f"{API_BASE}token/", json=data)
                 results.append({
                     'case': f'Case {i+1}: {list(data.keys())}',
                     'status': response.status_code,
@@ -192,46 +229,197 @@ def test_api_auth(request):
 
 @api_login_required
 def pos(request):
+    # Sales queued before a restart are submitted with this session
+    remember_credentials(request)
     return render(request, 'pages/pos.html')
 
+@api_login_required
+def pos_lookup(request):
+    """
+    Resolve a scanned barcode (or typed SKU) from the in-memory POS catalog
+    """
+    code = request.GET.get("code", "").strip()
+    if not code:
+        return JsonResponse({"error": "Missing code"}, status=400)
+    catalog = get_pos_catalog(request, f"{API_BASE}products/")
+    if catalog is None:
+        return JsonResponse({"error": "Backend API is offline"}, status=503)
+    product = catalog.lookup(code)
+    if product is None:
+        return JsonResponse({"found": False, "code": code}, status=404)
+    return JsonResponse({"found": True, "product": product.as_dict()})
+
+@api_login_required
+def pos_catalog_stats(request):
+    """
+    Size of the tenant's POS catalog, including its memory use per 10k products
+    """
+    catalog = get_pos_catalog(request, f"{API_BASE}products/")
+    if catalog is None:
+        return JsonResponse({"error": "Backend API is offline"}, status=503)
+    return JsonResponse(catalog.get_stats())
+
+def _money(value, field):
+    try:
+        amount = Decimal(str(value))
+    except ArithmeticError:
+        raise ValueError(f"Invalid {field}")
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"Invalid {field}")
+    return amount.quantize(Decimal("0.01"))
+
+def _parse_sale(body, catalog):
+    """
+    Validated (terminal, sale_id, payload) of a POS checkout; raises ValueError.
+    Items are priced from the tenant's POS catalog, not from the till.
+    """
+    terminal = str(body.get("terminal") or "").strip()[:64]
+    if not terminal:
+        raise ValueError("Missing terminal")
+    sale_id = uuid.UUID(str(body.get("sale_id") or uuid.uuid4()))
+    items = []
+    for item in body.get("items") or []:
+        quantity = int(item.get("quantity") or 0)
+        if not item.get("product_id") or quantity < 1:
+            raise ValueError("Each item needs a product_id and a positive quantity")
+        product = catalog.by_id.get(str(item["product_id"]))
+        if product is None:
+            raise ValueError(f"Unknown product {item['product_id']}")
+        items.append({
+            "product_id": product.product_id,
+            "quantity": quantity,
+            "price": str(_money(product.price, "price")),
+        })
+    if not items:
+        raise ValueError("The sale has no items")
+    total = sum(Decimal(item["price"]) * item["quantity"] for item in items)
+    received = body.get("amount_received")
+    payload = {
+        "items": items,
+        "total": str(total),
+        "payment_method": str(body.get("payment_method") or "cash"),
+        "amount_received": str(_money(received, "amount_received") if received not in (None, "") else total),
+        "sold_at": timezone.now().isoformat(),
+    }
+    return terminal, sale_id, payload
+
+@api_login_required
+def pos_checkout(request):
+    """
+    Accept a sale from the till right away; it is submitted to the backend
+    by the sale queue (see sale_queue)
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+    catalog = get_pos_catalog(request, f"{API_BASE}products/")
+    if catalog is None:
+        return JsonResponse({"error": "Backend API is offline"}, status=503)
+    try:
+        terminal, sale_id, payload = _parse_sale(json.loads(request.body or b"{}"), catalog)
+    except (ValueError, TypeError, AttributeError, ArithmeticError) as e:
+        return JsonResponse({"error": str(e) or "Invalid sale"}, status=400)
+    sale, created = enqueue_sale(request, terminal, sale_id, payload)
+    return JsonResponse({
+        "sale_id": str(sale.sale_id),
+        "status": sale.status,
+        "total": sale.payload.get("total"),
+        "duplicate": not created,
+    }, status=202)
+
+@api_login_required
+def pos_queue_status(request):
+    """
+    Depth and lag of the tenant's sale queue, optionally for one `terminal`
+    """
+    remember_credentials(request)
+    return JsonResponse(get_queue_status(request.session.get("user_client_id"), request.GET.get("terminal")))
+
+SEARCH_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+@api_login_required
+def product_search(request):
+    """
+    Typeahead over the tenant's products: ranked matches for `q` (name,
+    SKU or barcode; prefix or fuzzy), at most `limit` of them
+    """
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = min(max(int(request.GET.get("limit", SEARCH_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = SEARCH_LIMIT
+    index = get_search_index(request, f"{API_BASE}products/")
+    if index is None:
+        return JsonResponse({"error": "Backend API is offline"}, status=503)
+    started = time.perf_counter()
+    results = index.search(query, limit)
+    return JsonResponse({
+        "query": query,
+        "results": [product.as_dict() for product in results],
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+
 @api_login_required
 def purchases(request):
     return render(request, 'pages/purchases.html')
 
-@api_login_required
-def inventory(request):
+INVENTORY_CALLS = {
+    "products": f"{API_BASE}products/",
+    "categories": f"{API_BASE}categories/",
+    "units": f"{API_BASE}units/",
+}
+
+def _collect_products(items):
+    """
+    Build the product list and its stock statistics in a single pass over
+    the streamed items
+    """
+    products = []
+    total_stock = 0
+    low_stock_count = 0
+    for p in items:
+        products.append(p)
+        stock = p.get("stock", 0)
+        total_stock += stock
+        if stock <= p.get("minQuantity", 0):
+            low_stock_count += 1
+    return {"products": products, "total_stock": total_stock, "low_stock_count": low_stock_count}
+
+PRODUCT_CONSUMERS = {"products": _collect_products}
+
+# A call was skipped because the request ran out of time (see decorators.api_deadline)
+SLOW_API_MESSAGE = "⚠️ The backend API is slow: some data could not be loaded in time."
+
+def _inventory_context(results):
     products, categories, units = [], [], []
     total_stock = 0
     low_stock_count = 0
     api_online = True
     error_message = None
 
-    try:
-        # --- Fetch Products ---
-        resp_products = make_authenticated_request(request, "GET", f"{API_BASE}products/")
-        if resp_products.status_code == 200:
-            products = resp_products.json()
-            total_stock = sum(p.get("stock", 0) for p in products)
-            low_stock_count = sum(1 for p in products if p.get("stock", 0) <= p.get("minQuantity", 0))
+    if any(r.offline for r in results.values()):
+        api_online = False
+        error_message = "⚠️ Backend API is offline. Please try again later."
+    else:
+        # --- Products ---
+        if results["products"].ok:
+            products = results["products"].data["products"]
+            total_stock = results["products"].data["total_stock"]
+            low_stock_count = results["products"].data["low_stock_count"]
+        elif results["products"].skipped:
+            api_online = False
+            error_message = SLOW_API_MESSAGE
         else:
             api_online = False
-            error_message = f"⚠️ API error: {resp_products.status_code}"
-
-        # --- Fetch Categories ---
-        resp_cats = make_authenticated_request(request, "GET", f"{API_BASE}categories/")
-        if resp_cats.status_code == 200:
-            categories = resp_cats.json()
+            error_message = f"⚠️ API error: {results['products'].status_code}"
 
-        # --- Fetch Units ---
-        resp_units = make_authenticated_request(request, "GET", f"{API_BASE}units/")
-        if resp_units.status_code == 200:
-            units = resp_units.json()
+        # --- Categories / Units ---
+        if results["categories"].ok:
+            categories = results["categories"].data
+        if results["units"].ok:
+            units = results["units"].data
 
-    except requests.exceptions.ConnectionError:
-        api_online = False
-        error_message = "⚠️ Backend API is offline. Please try again later."
-
-    context = {
+    return {
         "products": products,
         "categories": categories,
         "units": units,
@@ -241,6 +429,15 @@ def inventory(request):
         "error_message": error_message,
     }
 
+@api_login_required
+@api_deadline(PAGE_DEADLINE)
+def inventory(request):
+    # Products, categories and units are independent: fetch them in parallel,
+    # categories and units come from the reference cache when possible
+    results, synced_at = fetch_with_catalog_mirror(request, INVENTORY_CALLS, PRODUCT_CONSUMERS)
+    context = _inventory_context(results)
+    context["catalog_synced_at"] = synced_at
+    context["import_job_id"] = request.session.get("product_import_job")
     return render(request, "pages/inventory.html", context)
 
 @api_login_required
@@ -258,31 +455,30 @@ def add_product(request):
             messages.error(request, "⚠️ Please select both a category and a unit.")
             return redirect("inventory")
 
-        data = {
-            "user_client": user_client,          # UUID
-            "category": category_id,             # UUID string ✅
-            "unit": unit_id,                     # UUID string ✅
-            "name": request.POST.get("name"),
-            "sku": request.POST.get("sku") or "",
-            "barcode": request.POST.get("barcode") or "",
-            "description": request.POST.get("description") or "",
-            "minQuantity": int(request.POST.get("minQuantity") or 0),
-            "price": str(request.POST.get("price") or "0.00"),
-            "cost": str(request.POST.get("cost") or "0.00"),
-            "stock": int(request.POST.get("stock") or 0),
-        }
+        data = build_product_payload(request.POST, user_client)
 
         # print("📦 ADD PRODUCT DATA:", data)
         resp = make_authenticated_request(request, "POST", f"{API_BASE}products/", data=data)
         # print("📦 RESPONSE:", resp.status_code, resp.text)
 
         if resp.status_code in [200, 201]:
+            product = _response_product(resp, data)
+            mirror_upsert(request, product)
+            index_upsert(request, product)
             messages.success(request, "✅ Product added successfully.")
         else:
             messages.error(request, f"❌ Failed to add product: {resp.text}")
 
     return redirect("inventory")
 
+def _response_product(response, fallback):
+    # The backend echoes the saved product; keep what we sent if it does not
+    try:
+        product = response.json()
+    except ValueError:
+        return fallback
+    return product if isinstance(product, dict) and product.get("product_id") else fallback
+
 # ----------------- EDIT PRODUCT -----------------
 @api_login_required
 def edit_product(request, product_id):
@@ -292,19 +488,7 @@ def edit_product(request, product_id):
             messages.error(request, "⚠️ Missing user client. Please re-login.")
             return redirect("inventory")
 
-        data = {
-            "user_client": user_client,                      # UUID string
-            "category": request.POST.get("category"),         # UUID string
-            "unit": request.POST.get("unit"),                 # UUID string
-            "name": request.POST.get("name"),
-            "sku": request.POST.get("sku") or "",
-            "barcode": request.POST.get("barcode") or "",
-            "description": request.POST.get("description") or "",
-            "minQuantity": int(request.POST.get("minQuantity") or 0),
-            "price": str(request.POST.get("price") or "0.00"),
-            "cost": str(request.POST.get("cost") or "0.00"),
-            "stock": int(request.POST.get("stock") or 0),
-        }
+        data = build_product_payload(request.POST, user_client)
 
         url = f"{API_BASE}products/{product_id}/"
         # print("✏️ EDIT PRODUCT:", data)
@@ -313,6 +497,9 @@ def edit_product(request, product_id):
         # print("✏️ RESPONSE:", response.status_code, response.text)
 
         if response.status_code in (200, 201):
+            product = _response_product(response, dict(data, product_id=str(product_id)))
+            mirror_upsert(request, product)
+            index_upsert(request, product)
             messages.success(request, "✅ Product updated successfully.")
         else:
             messages.error(request, f"❌ Failed to update product: {response.text}")
@@ -324,15 +511,16 @@ def edit_product(request, product_id):
 def delete_products(request):
     if request.method == "POST":
         ids = request.POST.getlist("product_ids")
-        deleted = 0
-        for pid in ids:
-            url = f"{API_BASE}products/{pid}/"
-            resp = make_authenticated_request(request, "DELETE", url)
-            if resp.status_code in (200, 204):
-                deleted += 1
-
-        if deleted:
-            messages.success(request, f"🗑️ Deleted {deleted} product(s).")
+        result = bulk_delete(request, {pid: f"{API_BASE}products/{pid}/" for pid in dict.fromkeys(ids)})
+        mirror_delete(request, result.succeeded)
+        index_delete(request, result.succeeded)
+
+        if result.succeeded and not result.failed:
+            messages.success(request, f"🗑️ Deleted {len(result.succeeded)} product(s).")
+        elif result.succeeded:
+            messages.warning(request, f"⚠️ {result.summary('Deleted')}")
+        elif result.failed:
+            messages.error(request, f"⚠️ No products deleted. {result.summary('Deleted')}")
         else:
             messages.error(request, "⚠️ No products deleted.")
     return redirect("inventory")
@@ -341,47 +529,52 @@ def delete_products(request):
 @api_login_required
 def upload_products_csv(request):
     if request.method == "POST" and request.FILES.get("file"):
-        file = request.FILES["file"]
-        decoded = file.read().decode("utf-8")
-        reader = csv.DictReader(io.StringIO(decoded))
-
-        user_client = request.session.get("user_client_id")
-        if not user_client:
+        if not request.session.get("user_client_id"):
             messages.error(request, "⚠️ Missing user client. Please re-login.")
             return redirect("inventory")
 
-        count = 0
-        for row in reader:
-            # Validate required fields exist
-            if not row.get("name") or not row.get("category") or not row.get("unit"):
-                continue  # skip incomplete rows
-
-            data = {
-                "user_client": user_client,
-                "category": row.get("category"),     # UUID or ID
-                "unit": row.get("unit"),             # UUID or ID
-                "name": row.get("name"),
-                "sku": row.get("sku") or "",
-                "barcode": row.get("barcode") or "",
-                "description": row.get("description") or "",
-                "minQuantity": int(row.get("minQuantity") or 0),
-                "price": str(row.get("price") or "0.00"),
-                "cost": str(row.get("cost") or "0.00"),
-                "stock": int(row.get("stock") or 0),
-            }
-
-            resp = make_authenticated_request(request, "POST", f"{API_BASE}products/", data=data)
-            if resp.status_code in (200, 201):
-                count += 1
-            else:
-                print("⚠️ Failed row:", row, resp.text)
-
-        messages.success(request, f"📦 Uploaded {count} products from CSV.")
+        # Rows are imported in the background; the inventory page polls the job
+        job = start_import(request, request.FILES["file"], f"{API_BASE}products/", {
+            "categories": f"{API_BASE}categories/",
+            "units": f"{API_BASE}units/",
+        })
+        request.session["product_import_job"] = str(job.id)
+        messages.info(request, "📦 CSV upload received. Importing products in the background...")
     else:
         messages.error(request, "⚠️ No file selected or invalid format.")
 
     return redirect("inventory")
 
+def _get_import_job(request, job_id):
+    return get_object_or_404(ProductImportJob, pk=job_id, user_client=request.session.get("user_client_id"))
+
+@api_login_required
+def upload_products_progress(request, job_id):
+    job = _get_import_job(request, job_id)
+    if job.finished and request.session.get("product_import_job") == str(job.id):
+        del request.session["product_import_job"]
+    return JsonResponse({
+        "id": str(job.id),
+        "filename": job.filename,
+        "status": job.status,
+        "processed": job.processed,
+        "created": job.created,
+        "updated": job.updated,
+        "unchanged": job.unchanged,
+        "failed": job.failed,
+        "finished": job.finished,
+        "message": job.message,
+        "errors_url": reverse("upload_products_errors", args=[job.id]) if os.path.exists(error_report_path(job.id)) else None,
+    })
+
+@api_login_required
+def upload_products_errors(request, job_id):
+    job = _get_import_job(request, job_id)
+    path = error_report_path(job.id)
+    if not os.path.exists(path):
+        raise Http404("No error report for this import")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=f"import-errors-{job.id}.csv")
+
 # @api_login_required
 # def product_management(request):
 #     """Show product management dashboard with categories, units, alerts, etc."""
@@ -397,46 +590,40 @@ def upload_products_csv(request):
 #         "alerts": alerts,
 #     })
 
-@api_login_required
-def product_management(request):
-    """Show product management dashboard with categories, units, alerts, etc."""
+PRODUCT_MANAGEMENT_CALLS = {
+    "products": f"{API_BASE}products/",
+    "categories": f"{API_BASE}categories/",
+    "units": f"{API_BASE}units/",
+    # stockalerts endpoint may not exist or fail independently
+    "alerts": f"{API_BASE}stockalerts/",
+}
+
+def _product_management_context(results):
     products, categories, units, alerts = [], [], [], []
     api_online = True
     error_message = None
 
-    try:
-        # Products
-        resp_products = make_authenticated_request(request, "GET", f"{API_BASE}products/")
-        if resp_products.status_code == 200:
-            products = resp_products.json()
-        else:
-            api_online = False
-            error_message = f"⚠️ API error: Products ({resp_products.status_code})"
-
-        # Categories
-        resp_cats = make_authenticated_request(request, "GET", f"{API_BASE}categories/")
-        if resp_cats.status_code == 200:
-            categories = resp_cats.json()
-
-        # Units
-        resp_units = make_authenticated_request(request, "GET", f"{API_BASE}units/")
-        if resp_units.status_code == 200:
-            units = resp_units.json()
-
-        # Stock Alerts
-        try:
-            resp_alerts = make_authenticated_request(request, "GET", f"{API_BASE}stockalerts/")
-            if resp_alerts.status_code == 200:
-                alerts = resp_alerts.json()
-        except Exception:
-            # stockalerts endpoint may not exist or fail independently
-            alerts = []
-
-    except requests.exceptions.ConnectionError:
+    if any(results[name].offline for name in ("products", "categories", "units")):
         api_online = False
         error_message = "⚠️ Backend API is offline. Please try again later."
+    else:
+        if results["products"].ok:
+            products = results["products"].data["products"]
+        elif results["products"].skipped:
+            api_online = False
+            error_message = SLOW_API_MESSAGE
+        else:
+            api_online = False
+            error_message = f"⚠️ API error: Products ({results['products'].status_code})"
 
-    context = {
+        if results["categories"].ok:
+            categories = results["categories"].data
+        if results["units"].ok:
+            units = results["units"].data
+        if results["alerts"].ok:
+            alerts = results["alerts"].data
+
+    return {
         "products": products,
         "categories": categories,
         "units": units,
@@ -445,6 +632,13 @@ def product_management(request):
         "error_message": error_message,
     }
 
+@api_login_required
+@api_deadline(PAGE_DEADLINE)
+def product_management(request):
+    """Show product management dashboard with categories, units, alerts, etc."""
+    results, synced_at = fetch_with_catalog_mirror(request, PRODUCT_MANAGEMENT_CALLS, PRODUCT_CONSUMERS)
+    context = _product_management_context(results)
+    context["catalog_synced_at"] = synced_at
     return render(request, "pages/product_management.html", context)
 
 # ----------------- CATEGORY CRUD -----------------
@@ -458,6 +652,7 @@ def add_category(request):
         }
         resp = make_authenticated_request(request, "POST", f"{API_BASE}categories/", data=data)
         if resp.status_code in (200, 201):
+            invalidate_reference_data(request, "categories")
             messages.success(request, "✅ Category added successfully.")
         else:
             messages.error(request, f"❌ Failed to add category: {resp.text}")
@@ -478,6 +673,7 @@ def edit_category(request, category_id):
         resp = make_authenticated_request(request, "PUT", url, data=data)
 
         if resp.status_code in [200, 201]:
+            invalidate_reference_data(request, "categories")
             messages.success(request, "✏️ Category updated successfully.")
         else:
             messages.error(request, f"❌ Failed to update: {resp.text}")
@@ -489,6 +685,7 @@ def delete_category(request, category_id):
     url = f"{API_BASE}categories/{category_id}/"
     resp = make_authenticated_request(request, "DELETE", url)
     if resp.status_code in (200, 204):
+        invalidate_reference_data(request, "categories")
         messages.success(request, "🗑️ Category deleted.")
     else:
         messages.error(request, f"❌ Delete failed: {resp.text}")
@@ -505,6 +702,7 @@ def add_unit(request):
         }
         resp = make_authenticated_request(request, "POST", f"{API_BASE}units/", data=data)
         if resp.status_code in (200, 201):
+            invalidate_reference_data(request, "units")
             messages.success(request, "✅ Unit added successfully.")
         else:
             messages.error(request, f"❌ Failed to add unit: {resp.text}")
@@ -525,6 +723,7 @@ def edit_unit(request, unit_id):
         resp = make_authenticated_request(request, "PUT", url, data=data)
 
         if resp.status_code in [200, 201]:
+            invalidate_reference_data(request, "units")
             messages.success(request, "✏️ Unit updated successfully.")
         else:
             messages.error(request, f"❌ Failed to update: {resp.text}")
@@ -536,12 +735,34 @@ def delete_unit(request, unit_id):
     url = f"{API_BASE}units/{unit_id}/"
     resp = make_authenticated_request(request, "DELETE", url)
     if resp.status_code in (200, 204):
+        invalidate_reference_data(request, "units")
         messages.success(request, "🗑️ Unit deleted.")
     else:
         messages.error(request, f"❌ Delete failed: {resp.text}")
     return redirect("product_management")
 
 
+@api_login_required
+def cache_stats(request):
+    """
+    Hit/miss counters of the per-tenant reference data cache and of the
+    conditional GETs (304s answered locally, bytes saved) of this worker
+    """
+    return JsonResponse({
+        'reference_data': reference_cache.get_stats(),
+        'dashboard': dashboard_cache.get_stats(),
+        'conditional_get': get_api_client().conditional.get_stats(),
+    })
+
+def api_metrics(request):
+    """
+    Prometheus scrape endpoint for the outbound API metrics of this worker
+    """
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_login_required
 def sales(request):
     return render(request, 'pages/sales.html')
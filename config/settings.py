@@ -80,6 +80,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "apps.pages.middleware.api_request_scope_middleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -105,6 +106,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# Serve the I/O-bound pages with async views (use with the ASGI profile, see README)
+ASYNC_VIEWS = str2bool(os.environ.get('ASYNC_VIEWS', 'False'))
 
 
 # Database
@@ -208,3 +213,127 @@ REST_FRAMEWORK = {
     ],
 }
 ########################################
+
+# ### API Client Settings ###
+API_CLIENT = {
+    # Seconds to wait for the TCP connect / for each read from the backend API
+    'CONNECT_TIMEOUT' : float(os.getenv('API_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT'    : float(os.getenv('API_READ_TIMEOUT'   , 15)),
+    # Keep-alive pool per worker process
+    'POOL_CONNECTIONS': int(os.getenv('API_POOL_CONNECTIONS', 10)),
+    'POOL_MAXSIZE'    : int(os.getenv('API_POOL_MAXSIZE'    , 20)),
+    # Max threads used to run a view's independent backend calls in parallel
+    'FANOUT_WORKERS'  : int(os.getenv('API_FANOUT_WORKERS'  , 4)),
+    # Refresh the JWT access token this many seconds before it expires
+    'TOKEN_REFRESH_LEEWAY': int(os.getenv('API_TOKEN_REFRESH_LEEWAY', 30)),
+    # Circuit breaker: open after N consecutive failures, probe again after the timeout
+    'BREAKER_FAILURE_THRESHOLD': int(os.getenv('API_BREAKER_FAILURE_THRESHOLD', 5)),
+    'BREAKER_RECOVERY_TIMEOUT' : int(os.getenv('API_BREAKER_RECOVERY_TIMEOUT' , 30)),
+    'BREAKER_HALF_OPEN_PROBES' : int(os.getenv('API_BREAKER_HALF_OPEN_PROBES' , 1)),
+    # Send If-None-Match/If-Modified-Since on tenant GETs and serve 304s locally
+    'CONDITIONAL_GET'          : str2bool(os.getenv('API_CONDITIONAL_GET', 'True')),
+    'CONDITIONAL_MAX_ENTRIES'  : int(os.getenv('API_CONDITIONAL_MAX_ENTRIES', 256)),
+    # Streamed list responses: read size, and max body kept for conditional GETs
+    'STREAM_CHUNK_SIZE'        : int(os.getenv('API_STREAM_CHUNK_SIZE', 64 * 1024)),
+    'STREAM_CAPTURE_MAX_BYTES' : int(os.getenv('API_STREAM_CAPTURE_MAX_BYTES', 2 * 1024 * 1024)),
+    # Share identical in-flight tenant GETs between requests; the window (seconds)
+    # also lets callers reuse a just-completed response
+    'COALESCE_GETS'            : str2bool(os.getenv('API_COALESCE_GETS', 'True')),
+    'COALESCE_WINDOW'          : float(os.getenv('API_COALESCE_WINDOW', 0.0)),
+    # Retries of idempotent calls on connection errors, timeouts and these statuses:
+    # exponential backoff with jitter, all attempts within RETRY_DEADLINE seconds
+    'RETRY_STATUSES'           : tuple(int(s) for s in os.getenv('API_RETRY_STATUSES', '502,503,504').split(',') if s),
+    'RETRY_MAX_ATTEMPTS'       : int(os.getenv('API_RETRY_MAX_ATTEMPTS', 3)),
+    'RETRY_BACKOFF'            : float(os.getenv('API_RETRY_BACKOFF'    , 0.1)),
+    'RETRY_BACKOFF_MAX'        : float(os.getenv('API_RETRY_BACKOFF_MAX', 2.0)),
+    'RETRY_DEADLINE'           : float(os.getenv('API_RETRY_DEADLINE'   , 5.0)),
+    # Worker-wide retry budget: each call earns RATIO retries, at most MAX are banked
+    'RETRY_BUDGET_RATIO'       : float(os.getenv('API_RETRY_BUDGET_RATIO', 0.1)),
+    'RETRY_BUDGET_MAX'         : int(os.getenv('API_RETRY_BUDGET_MAX'    , 20)),
+    # Total seconds the backend calls of one GET page may take (0 = no limit); past
+    # it, remaining calls are skipped and the page renders partial data. Writes are
+    # never capped. Read-heavy views set their own with @api_deadline(seconds)
+    'REQUEST_DEADLINE'         : float(os.getenv('API_REQUEST_DEADLINE', 0)),
+    # A backend node failing this many calls in a row is ejected from the pool
+    # for EJECT_DURATION seconds
+    'BACKEND_EJECT_THRESHOLD'  : int(os.getenv('API_BACKEND_EJECT_THRESHOLD', 3)),
+    'BACKEND_EJECT_DURATION'   : int(os.getenv('API_BACKEND_EJECT_DURATION' , 30)),
+}
+########################################
+
+# ### API Backends ###
+# Base URLs of the backend API nodes, comma separated. Calls are balanced over the
+# healthy ones (least outstanding requests); endpoint URLs are built on the first.
+API_BACKENDS = [
+    url.strip() for url in os.getenv('API_BACKENDS', 'http://127.0.0.1:8080/api/').split(',') if url.strip()
+]
+########################################
+
+# ### Reference Data Cache ###
+# Per-tenant categories/units. Stored in the `default` cache: configure a shared
+# CACHES backend (Redis, Memcached, DB) to share it between workers.
+REFERENCE_DATA_CACHE = {
+    'TTL'       : int(os.getenv('REFDATA_CACHE_TTL'      , 300)),  # served as fresh
+    'STALE_TTL' : int(os.getenv('REFDATA_CACHE_STALE_TTL', 600)),  # served stale while revalidating
+}
+########################################
+
+# ### Catalog Mirror ###
+# Local copy of each tenant's product catalog, served to the inventory pages.
+# Reads older than SYNC_INTERVAL seconds trigger a background delta sync.
+CATALOG_MIRROR = {
+    'ENABLED'       : str2bool(os.getenv('CATALOG_MIRROR_ENABLED', 'True')),
+    'SYNC_INTERVAL' : int(os.getenv('CATALOG_MIRROR_SYNC_INTERVAL', 60)),
+}
+########################################
+
+# ### API Health Monitor ###
+# Probes the backend in the background; templates read the last result from the cache.
+# Set API_HEALTH_IN_PROCESS=False when running `manage.py api_health_monitor` as a
+# separate process against a shared cache backend.
+API_HEALTH_MONITOR = {
+    'INTERVAL'  : int(os.getenv('API_HEALTH_INTERVAL', 15)),
+    'TIMEOUT'   : float(os.getenv('API_HEALTH_TIMEOUT', 2)),
+    'IN_PROCESS': str2bool(os.getenv('API_HEALTH_IN_PROCESS', 'True')),
+}
+########################################
+
+# ### Bulk Operations ###
+# Concurrency and retry limits of bulk backend writes (e.g. deleting products)
+BULK_OPERATIONS = {
+    'CONCURRENCY' : int(os.getenv('BULK_CONCURRENCY' , 8)),
+    'MAX_ATTEMPTS': int(os.getenv('BULK_MAX_ATTEMPTS', 3)),
+    'RETRY_BUDGET': float(os.getenv('BULK_RETRY_BUDGET', 0.2)),
+}
+########################################
+
+# ### Product CSV Import ###
+# Uploads are imported in a background thread; files and error reports live in UPLOAD_DIR
+PRODUCT_IMPORT = {
+    'UPLOAD_DIR' : os.getenv('PRODUCT_IMPORT_DIR', os.path.join(BASE_DIR, 'media', 'imports')),
+    'CONCURRENCY': int(os.getenv('PRODUCT_IMPORT_CONCURRENCY', 8)),
+}
+########################################
+
+# ### Dashboard ###
+# KPI snapshots are cached per tenant; stale ones are served while refreshed in the background
+DASHBOARD_SNAPSHOT = {
+    'TTL'      : int(os.getenv('DASHBOARD_SNAPSHOT_TTL', 30)),
+    'STALE_TTL': int(os.getenv('DASHBOARD_SNAPSHOT_STALE_TTL', 300)),
+}
+########################################
+
+# ### POS Sale Queue ###
+# Checkouts are stored locally and submitted to the backend in the background
+SALE_QUEUE = {
+    'BATCH_SIZE' : int(os.getenv('SALE_QUEUE_BATCH_SIZE', 50)),
+    'CONCURRENCY': int(os.getenv('SALE_QUEUE_CONCURRENCY', 4)),
+    'INTERVAL'   : float(os.getenv('SALE_QUEUE_INTERVAL', 2)),
+}
+########################################
+
+# ### Metrics ###
+# /metrics serves the outbound API metrics in the Prometheus text format.
+# When set, scrapers must send `Authorization: Bearer <token>`.
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', None)
+########################################
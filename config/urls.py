@@ -15,7 +15,7 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import include, path
-from apps.pages import views as pages_views
+from apps.pages.urls import io_views as pages_views
 
 urlpatterns = [
     path('accounts/register/', pages_views.register, name='register'),
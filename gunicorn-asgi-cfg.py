@@ -0,0 +1,21 @@
+# -*- encoding: utf-8 -*-
+"""
+ASGI deployment profile.
+
+    ASYNC_VIEWS=True gunicorn --config gunicorn-asgi-cfg.py config.asgi
+
+Each uvicorn worker runs an event loop, so the async views keep serving
+other tills while they wait on the backend API.
+"""
+
+import os
+
+bind = '0.0.0.0:5005'
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'uvicorn.workers.UvicornWorker'
+timeout = 60
+keepalive = 5
+accesslog = '-'
+loglevel = 'info'
+capture_output = True
+enable_stdio_inheritance = True